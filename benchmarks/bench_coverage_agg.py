@@ -0,0 +1,68 @@
+"""Compare data.create_output_df with the previous mask-columns + groupby().count() + merge aggregation.
+
+python -m benchmarks.bench_coverage_agg [NUM_ROWS ...]
+
+classify_url_video is computed once up front and reused by both paths, so only the aggregation is measured. Time and
+tracemalloc peak are reported; the input frame has the data.read_input_csv dtypes, as in the app.
+"""
+
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.synthetic import make_inventory
+from benchmarks.temp_paths import use_temp_paths
+from src import data
+from src.constants import *
+
+classify_url_video = data.classify_url_video
+
+
+def groupby_path(df: pd.DataFrame, date: str) -> pd.DataFrame:
+    """create_output_df before the single pass aggregation."""
+    df = df.copy()  # it used to add its columns to the caller's frame
+    masks = data.classify_url_video(df)
+    for col, mask in masks.items():
+        df[col] = mask.where(mask)
+
+    df_type = df[[CSV_VENDOR, CSV_TYPE]].drop_duplicates(CSV_VENDOR).astype(object)
+    df = df[[CSV_VENDOR, SS_VALID_URLS, SS_BLANK_URLS, SS_VIDEO_TRUE, SS_VIDEO_FALSE, CSV_VIDEO]]
+    df = df.groupby(CSV_VENDOR, as_index=False, observed=True).count()
+    df[CSV_VENDOR] = df[CSV_VENDOR].astype(object)
+    df = pd.merge(df, df_type, on=CSV_VENDOR)
+    df[SS_DATE] = date
+    df[CSV_TYPE] = df[CSV_TYPE].apply(lambda x: "Lab" if "lab" in x.lower() else "Natural" if x else "")
+    df.rename(columns={CSV_VIDEO: SS_VIDEO_INV, CSV_VENDOR: SS_VENDOR, CSV_TYPE: SS_TYPE}, inplace=True)
+    df[SS_PERC_INV] = 1 - ((df[SS_VIDEO_INV] - df[SS_VIDEO_TRUE]) / df[SS_VIDEO_INV])
+    df[SS_PERC_INV_URL] = (1 - ((df[SS_VIDEO_INV] - df[SS_VALID_URLS]) / df[SS_VIDEO_INV])).round(4)
+    df.fillna("", inplace=True)
+    return df
+
+
+def measure(func, *args) -> tuple[float, float, pd.DataFrame]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1024**2
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main(sizes: list[int]) -> None:
+    print(f"{'rows':>10}{'groupby (s)':>13}{'peak (MB)':>11}{'single pass (s)':>17}{'peak (MB)':>11}")
+    for size in sizes:
+        df = make_inventory(size).astype({CSV_VENDOR: "category", CSV_VIDEO: "category", CSV_TYPE: "category"})
+        masks = classify_url_video(df)
+        data.classify_url_video = lambda _: masks
+        old_time, old_peak, old_df = measure(groupby_path, df, "2024-08-12")
+        new_time, new_peak, new_df = measure(data.create_output_df, df, "2024-08-12")
+        pd.testing.assert_frame_equal(old_df, new_df)
+        print(f"{size:>10}{old_time:>13.3f}{old_peak:>11.1f}{new_time:>17.3f}{new_peak:>11.1f}")
+
+
+if __name__ == "__main__":
+    use_temp_paths()
+    main([int(i) for i in sys.argv[1:]] or [100_000, 1_000_000])
@@ -0,0 +1,53 @@
+"""Compare the old upload parsing (decode, StringIO, default read_csv) with data.read_input_csv.
+
+python -m benchmarks.bench_ingest [NUM_ROWS]
+
+The synthetic CSV gets filler columns so it is about as wide as the real inventory export.
+"""
+
+import io
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_inventory
+from benchmarks.temp_paths import use_temp_paths
+from src import data
+
+FILLER_COLUMNS: int = 40
+
+
+def make_csv_bytes(num_rows: int) -> bytes:
+    df = make_inventory(num_rows)
+    rng = np.random.default_rng(1)
+    for i in range(FILLER_COLUMNS):
+        df[f"Filler {i}"] = rng.uniform(0, 1000, num_rows).round(2) if i % 2 else rng.choice(["A", "B", "C"], num_rows)
+    return df.to_csv(index=False).encode()
+
+
+def old_path(raw: bytes):
+    import pandas as pd
+
+    with io.StringIO(io.BytesIO(raw).read().decode()) as f:
+        return pd.read_csv(f)
+
+
+def main(num_rows: int) -> None:
+    raw = make_csv_bytes(num_rows)
+    print(f"{num_rows} rows, {len(raw) / 1024**2:.1f} MB CSV")
+    paths = {"decode + read_csv": old_path, "read_input_csv (c)": lambda b: data.read_input_csv(io.BytesIO(b), "c")}
+    if data.CSV_ENGINE == "pyarrow":
+        paths["read_input_csv (pyarrow)"] = lambda b: data.read_input_csv(io.BytesIO(b), "pyarrow")
+
+    print(f"{'path':<28}{'parse (s)':>10}{'frame (MB)':>12}")
+    for name, func in paths.items():
+        start = time.perf_counter()
+        df = func(raw)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<28}{elapsed:>10.3f}{df.memory_usage(deep=True).sum() / 1024**2:>12.1f}")
+
+
+if __name__ == "__main__":
+    use_temp_paths()
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
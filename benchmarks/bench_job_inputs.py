@@ -0,0 +1,45 @@
+"""Serialization cost of sending a run to a worker process: the whole Main, as run.cpu_bound(main.run_*) pickled it,
+against the two columns Main.classify_url_video sends to cpu_pool and the masks it gets back.
+
+python -m benchmarks.bench_job_inputs [NUM_ROWS]
+"""
+
+import pickle
+import sys
+import time
+
+from benchmarks.synthetic import make_inventory
+from benchmarks.temp_paths import use_temp_paths
+from src import data
+from src.constants import *
+from src.main import Main
+
+
+def pickle_cost(obj: object) -> tuple[float, float, float]:
+    """Return (dump + load seconds, MB)."""
+    start = time.perf_counter()
+    raw = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    pickle.loads(raw)
+    return time.perf_counter() - start, len(raw) / 1024**2
+
+
+def main(num_rows: int) -> None:
+    main = Main()
+    main.input_df = make_inventory(num_rows)[list(data.INPUT_DTYPES)].astype(data.INPUT_DTYPES)
+    masks = data.classify_url_video(main.input_df)
+
+    payloads = {
+        "Main (cpu_bound)": main,
+        "URL + video cols": main.input_df[[CSV_URL, CSV_VIDEO]],
+        "masks returned": masks,
+    }
+    print(f"{num_rows} rows")
+    print(f"{'payload':<20}{'time (s)':>10}{'size (MB)':>12}")
+    for name, payload in payloads.items():
+        elapsed, size = pickle_cost(payload)
+        print(f"{name:<20}{elapsed:>10.3f}{size:>12.1f}")
+
+
+if __name__ == "__main__":
+    use_temp_paths()
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500_000)
@@ -0,0 +1,71 @@
+"""Compare the previous iterrows + Row model payloads of SSheet.upload_dataframe with SSheet.row_payloads.
+
+python -m benchmarks.bench_row_payloads [NUM_ROWS ...]
+
+The audit frame comes from data.parse_vendor_audit on synthetic inventory. Both paths are consumed by ss.chunk_rows,
+as in upload_rows, so the JSON sizing is included. Time is measured first, then the tracemalloc peak in a second pass,
+as tracing slows the Row model path down many times over.
+"""
+
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.synthetic import make_inventory
+from benchmarks.temp_paths import use_temp_paths
+from src import data, ss
+from src.constants import *
+from src.fake_ss import FakeSmartsheet
+
+
+def make_audit_ssheet() -> ss.SSheet:
+    fake = FakeSmartsheet()
+    sheet_id = fake.add_sheet("Audit", [SS_VENDOR, SS_VIDEO_LINK, SS_STOCK, SS_CERT, SS_DATE])
+    ssheet = ss.SSheet(client=fake.client())
+    ssheet.get_sheet(sheet_id)
+    return ssheet
+
+
+def iterrows_path(ssheet: ss.SSheet, df: pd.DataFrame):
+    """upload_dataframe's row loop before row_payloads."""
+    for row in df.iterrows():
+        cells = [
+            {
+                "column_id": ss.get_dict_value(ssheet.cols_dict, col),
+                "value": val,
+                "displayValue": str(val),
+                **ssheet.base_row_vals,
+            }
+            for col, val in row[1].items()
+        ]
+        yield ssheet.ss_client.models.Row({"toBottom": True, "cells": cells})
+
+
+def row_payloads_path(ssheet: ss.SSheet, df: pd.DataFrame):
+    return ssheet.row_payloads(df, display_value=True, toBottom=True)
+
+
+def main(sizes: list[int]) -> None:
+    ssheet = make_audit_ssheet()
+    print(f"{'rows':>8}  {'path':<14}{'time (s)':>10}{'rows/s':>12}{'peak (MB)':>12}{'chunks':>8}")
+    for num_rows in sizes:
+        inventory = make_inventory(num_rows * 2)
+        vendors = list(inventory[CSV_VENDOR].unique())
+        df = data.parse_vendor_audit(inventory, vendors, "2024-08-12", num_rows)
+        for name, func in {"iterrows": iterrows_path, "row_payloads": row_payloads_path}.items():
+            start = time.perf_counter()
+            chunks = sum(1 for _ in ss.chunk_rows(func(ssheet, df)))
+            elapsed = time.perf_counter() - start
+
+            tracemalloc.start()
+            sum(1 for _ in ss.chunk_rows(func(ssheet, df)))
+            peak = tracemalloc.get_traced_memory()[1] / 1024**2
+            tracemalloc.stop()
+            print(f"{len(df):>8}  {name:<14}{elapsed:>10.3f}{len(df) / elapsed:>12.0f}{peak:>12.1f}{chunks:>8}")
+
+
+if __name__ == "__main__":
+    use_temp_paths()
+    main([int(i) for i in sys.argv[1:]] or [10_000, 50_000])
@@ -0,0 +1,119 @@
+"""End-to-end throughput of Main.run_both against the in-process fake Smartsheet backend.
+
+python -m benchmarks.bench_run_both [--rows N] [--vendors N] [--weeks N] [--latency S] [--rate-limit N]
+
+The coverage sheet is seeded with `weeks` of history for 80% of the vendors, so the rest are uploaded as new vendors.
+Reports wall time, requests, throttled requests, overlapping writes rejected with errorCode 4004, bytes sent/received
+and peak process memory for each upload mode, for batched uploads with the two pipelines run one after the other,
+and for batched uploads with 3 upload workers writing to the coverage sheet at once.
+"""
+
+import argparse
+import time
+
+from benchmarks.synthetic import make_inventory
+from benchmarks.temp_paths import use_temp_paths
+from src.constants import *
+from src.fake_ss import FakeSmartsheet
+from src.main import Main
+
+COVERAGE_COLUMNS: list[str] = [
+    SS_VENDOR,
+    SS_VALID_URLS,
+    SS_BLANK_URLS,
+    SS_VIDEO_TRUE,
+    SS_VIDEO_FALSE,
+    SS_VIDEO_INV,
+    SS_TYPE,
+    SS_DATE,
+    SS_PERC_INV,
+    SS_PERC_INV_URL,
+    SS_INV_DELTA,
+    SS_VID_INV_DELTA,
+]
+AUDIT_COLUMNS: list[str] = [SS_VENDOR, SS_VIDEO_LINK, SS_STOCK, SS_CERT, SS_DATE]
+
+
+def make_backend(vendors: list[str], weeks: int, latency: float, rate_limit: int | None) -> FakeSmartsheet:
+    fake = FakeSmartsheet(latency=latency, rate_limit=rate_limit)
+    coverage_id = fake.add_sheet(COVERAGES_SHEET_NAME, COVERAGE_COLUMNS)
+    fake.add_sheet(AUDIT_SHEET_NAME, AUDIT_COLUMNS)
+
+    for vendor in vendors[: int(len(vendors) * 0.8)]:
+        [parent_id] = fake.seed_rows(coverage_id, [{SS_VENDOR: vendor}])
+        history = [
+            {
+                SS_VENDOR: vendor,  # child rows repeat the vendor, as uploaded by Main.iterate_and_load_rows
+                SS_VIDEO_TRUE: 100 - week,
+                SS_VIDEO_INV: 200,
+                SS_PERC_INV: (100 - week) / 200,
+                SS_DATE: f"week {week}",
+            }
+            for week in range(weeks)
+        ]
+        fake.seed_rows(coverage_id, history, parent_id=parent_id)
+    return fake
+
+
+def run(
+    args: argparse.Namespace, input_df, batch_uploads: bool, parallel: bool = True, upload_workers: int = None
+) -> dict:
+    use_temp_paths()  # no sheet ids or runs cached by an earlier mode, so the request counts compare
+    vendors = sorted(input_df[CSV_VENDOR].unique())
+    fake = make_backend(vendors, args.weeks, args.latency, args.rate_limit)
+
+    main = Main()
+    main.ss_client = fake.client()
+    main.input_df = input_df
+    main.date = "2024-08-12"
+    main.coverages_sheet_name = COVERAGES_SHEET_NAME
+    main.audit_sheet_name = AUDIT_SHEET_NAME
+    main.audit_num = args.audit_num
+    main.selected_vendors = {i: True for i in vendors}
+    main.batch_uploads = batch_uploads
+    main.upload_workers = upload_workers
+
+    start = time.perf_counter()
+    if parallel:
+        main.run_both()
+    else:
+        main.run_coverages()
+        main.run_audits()
+    return {
+        "wall (s)": time.perf_counter() - start,
+        "requests": fake.request_count,
+        "throttled": fake.throttled_count,
+        "conflicts": fake.conflict_count,
+        "sent (KB)": fake.bytes_sent / 1024,
+        "received (KB)": fake.bytes_received / 1024,
+        "peak (MB)": main.peak_memory_mb,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--vendors", type=int, default=150)
+    parser.add_argument("--weeks", type=int, default=20)
+    parser.add_argument("--audit-num", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per request")
+    parser.add_argument("--rate-limit", type=int, default=None, help="requests per minute before 429s")
+    args = parser.parse_args()
+
+    input_df = make_inventory(args.rows, args.vendors)
+
+    modes = (
+        ("batched", True, True, None),
+        ("per-row", False, True, None),
+        ("sequential", True, False, None),
+        ("3 workers", True, True, 3),
+    )
+    for i, (mode, batch_uploads, parallel, upload_workers) in enumerate(modes):
+        stats = run(args, input_df.copy(), batch_uploads, parallel, upload_workers)
+        if i == 0:
+            print(f"{'mode':<10}" + "".join(f"{k:>15}" for k in stats))
+        print(f"{mode:<10}" + "".join(f"{v:>15.1f}" if isinstance(v, float) else f"{v:>15}" for v in stats.values()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Compare SSheet lookups on the columnar SheetIndex with the previous row model scans.
+
+python -m benchmarks.bench_sheet_index [--vendors N] [--weeks N]
+
+The "scan" columns reimplement the lookups as they were before the index: to_dict() on every row, a linear cell scan
+per requested column and a walk over every cell for column values. Time and tracemalloc peak are reported for each,
+the index build is reported on its own as it happens once per sheet load.
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.bench_run_both import COVERAGE_COLUMNS
+from benchmarks.temp_paths import use_temp_paths
+from src import ss
+from src.constants import *
+from src.fake_ss import FakeSmartsheet
+
+CELL_COLS: dict[str, str] = {"Prev Video": SS_VIDEO_TRUE, "Prev Inven": SS_PERC_INV}
+
+
+def scan_parents_and_first_child(ssheet: ss.SSheet) -> dict:
+    previous_values = {}
+    for i, row in enumerate(ssheet.sheet.rows.to_list()):
+        row = row.to_dict()
+        if not row.get("parentId"):
+            parent_name = row["cells"][0].get("value")
+            if parent_name:
+                ssheet.parent_rows.update({parent_name: row["id"]})
+                parent_index = i
+        elif i == parent_index + 1:
+            values = {}
+            for k, v in CELL_COLS.items():
+                col_id = ssheet.cols_dict[v]
+                values[k] = next((cell.get("value", "") for cell in row["cells"] if cell["columnId"] == col_id), None)
+            previous_values[parent_name] = values
+    return previous_values
+
+
+def scan_col_values(ssheet: ss.SSheet) -> list:
+    col_id = ssheet.cols_dict[SS_DATE]
+    return [cell.value for row in ssheet.sheet.rows for cell in row.cells if cell.column_id == col_id]
+
+
+def index_parents_and_first_child(ssheet: ss.SSheet) -> dict:
+    ssheet.get_parents_and_first_child_data(CELL_COLS)
+    return ssheet.previous_values
+
+
+def index_col_values(ssheet: ss.SSheet) -> list:
+    return ssheet.get_col_values_by_col_name(SS_DATE)
+
+
+def measure(func, *args) -> tuple[float, float]:
+    """Return (seconds, peak MB) for one call."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1024**2
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vendors", type=int, default=150)
+    parser.add_argument("--weeks", type=int, default=26)
+    args = parser.parse_args()
+
+    fake = FakeSmartsheet()
+    sheet_id = fake.add_sheet(COVERAGES_SHEET_NAME, COVERAGE_COLUMNS)
+    for i in range(args.vendors):
+        [parent_id] = fake.seed_rows(sheet_id, [{SS_VENDOR: f"VENDOR {i}"}])
+        history = [
+            {col: week for col in COVERAGE_COLUMNS[1:] if col != SS_DATE}
+            | {SS_VENDOR: f"VENDOR {i}", SS_DATE: f"week {week}"}
+            for week in range(args.weeks)
+        ]
+        fake.seed_rows(sheet_id, history, parent_id=parent_id)
+
+    ssheet = ss.SSheet(client=fake.client())
+    ssheet.get_sheet(sheet_id)
+    print(f"{len(ssheet.index.row_ids)} rows x {len(COVERAGE_COLUMNS)} columns")
+
+    build_time, build_peak = measure(ss.SheetIndex, ssheet.sheet.rows)
+    print(f"{'index build':<28}{build_time:>10.3f}s{build_peak:>10.1f} MB")
+
+    if scan_parents_and_first_child(ssheet) != index_parents_and_first_child(ssheet):
+        raise AssertionError("previous values differ")
+    if scan_col_values(ssheet) != index_col_values(ssheet):
+        raise AssertionError("column values differ")
+
+    for name, scan, indexed in (
+        ("parents + first child", scan_parents_and_first_child, index_parents_and_first_child),
+        ("column values", scan_col_values, index_col_values),
+    ):
+        scan_time, scan_peak = measure(scan, ssheet)
+        index_time, index_peak = measure(indexed, ssheet)
+        print(f"{name + ' (scan)':<28}{scan_time:>10.3f}s{scan_peak:>10.1f} MB")
+        print(f"{name + ' (index)':<28}{index_time:>10.3f}s{index_peak:>10.1f} MB")
+
+
+if __name__ == "__main__":
+    use_temp_paths()
+    main()
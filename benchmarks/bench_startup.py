@@ -0,0 +1,59 @@
+"""Import time of the modules loaded before the UI appears, and of the ones loaded in the background afterwards.
+
+python -m benchmarks.bench_startup [--top N]
+
+Each group is imported in a fresh interpreter with -X importtime. diamonds itself is only measured if nicegui is
+installed. The time to first paint of a real launch is appended to logs/startup.log by diamonds.log_first_paint.
+"""
+
+import argparse
+import importlib.util
+import subprocess
+import sys
+
+from benchmarks.temp_paths import use_temp_paths
+
+GROUPS: dict[str, list[str]] = {
+    "startup": ["src.main", "src.utils", "src.help_md"],
+    "background": ["src.data", "src.ss"],
+}
+
+
+def import_times(modules: list[str]) -> list[tuple[str, int]]:
+    """Return (module, cumulative microseconds) for each top-level import, as reported by -X importtime."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {', '.join(modules)}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        if not name.startswith("  "):  # nested imports are indented
+            times.append((name.strip(), int(cumulative)))
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=8, help="slowest top-level imports to list per group")
+    args = parser.parse_args()
+
+    groups = dict(GROUPS)
+    if importlib.util.find_spec("nicegui"):
+        groups["diamonds"] = ["diamonds"]
+
+    for group, modules in groups.items():
+        top_level = import_times(modules)
+        total = sum(us for _, us in top_level)
+        print(f"{group} ({', '.join(modules)}): {total / 1000:.0f} ms")
+        for name, us in sorted(top_level, key=lambda i: i[1], reverse=True)[: args.top]:
+            print(f"  {name:<30}{us / 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    use_temp_paths()
+    main()
@@ -0,0 +1,57 @@
+"""Compare time and peak memory of the in-memory coverages and audit path with data.stream_outputs.
+
+python -m benchmarks.bench_stream [NUM_ROWS] [CHUNK_ROWS]
+
+Each path runs in a fresh process, so its peak memory is its own. The CSV gets the filler columns of bench_ingest.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.bench_ingest import make_csv_bytes
+from benchmarks.temp_paths import use_temp_paths
+from src import data, utils
+
+DATE: str = "2024-08-12"
+AUDIT_NUM: int = 10
+
+
+def in_memory(path: str, chunk_rows: int) -> tuple[float, float]:
+    start = time.perf_counter()
+    df = data.read_input_csv(path)
+    masks = data.classify_url_video(df)
+    data.create_output_df(df, DATE, masks)
+    vendors = [i for i in df[data.CSV_VENDOR].dropna().unique() if i != "BE Internal"]
+    data.parse_vendor_audit(df, vendors, DATE, AUDIT_NUM, masks[data.SS_VIDEO_TRUE])
+    return time.perf_counter() - start, utils.peak_memory_mb()
+
+
+def streaming(path: str, chunk_rows: int) -> tuple[float, float]:
+    start = time.perf_counter()
+    data.stream_outputs(path, DATE, AUDIT_NUM, chunksize=chunk_rows)
+    return time.perf_counter() - start, utils.peak_memory_mb()
+
+
+def main(num_rows: int, chunk_rows: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "inventory.csv")
+        with open(path, "wb") as f:
+            f.write(make_csv_bytes(num_rows))
+        print(f"{num_rows} rows, {os.path.getsize(path) / 1024**2:.1f} MB CSV, chunks of {chunk_rows} rows")
+
+        print(f"{'path':<16}{'time (s)':>10}{'peak (MB)':>12}")
+        for name, func in {"in memory": in_memory, "stream_outputs": streaming}.items():
+            with ProcessPoolExecutor(1) as pool:
+                elapsed, peak = pool.submit(func, path, chunk_rows).result()
+            print(f"{name:<16}{elapsed:>10.3f}{peak:>12.0f}")
+
+
+if __name__ == "__main__":
+    use_temp_paths()
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else data.CHUNK_ROWS,
+    )
@@ -0,0 +1,47 @@
+"""Compare the Series.apply URL/video checks with data.classify_url_video.
+
+python -m benchmarks.bench_url_classify [NUM_ROWS ...]
+"""
+
+import sys
+import time
+
+from benchmarks.synthetic import make_inventory
+from benchmarks.temp_paths import use_temp_paths
+from src import data
+from src.constants import *
+
+
+def apply_path(df):
+    return (
+        df[CSV_URL].apply(data.check_url_field, args=(False,)).count(),
+        df[CSV_URL].apply(data.check_url_field, args=(True,)).count(),
+        df[CSV_VIDEO].apply(data.check_video_field, args=(False,)).count(),
+        df[CSV_VIDEO].apply(data.check_video_field, args=(True,)).count(),
+    )
+
+
+def vectorized_path(df):
+    return tuple(data.classify_url_video(df).sum())
+
+
+def timed(func, df) -> tuple[float, tuple]:
+    start = time.perf_counter()
+    result = func(df)
+    return time.perf_counter() - start, result
+
+
+def main(sizes: list[int]) -> None:
+    print(f"{'rows':>10} {'apply (s)':>10} {'vector (s)':>11} {'speedup':>8}")
+    for size in sizes:
+        df = make_inventory(size)
+        apply_time, apply_counts = timed(apply_path, df)
+        vector_time, vector_counts = timed(vectorized_path, df)
+        if apply_counts != vector_counts:
+            raise AssertionError(f"Counts differ: {apply_counts} != {vector_counts}")
+        print(f"{size:>10} {apply_time:>10.3f} {vector_time:>11.3f} {apply_time / vector_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    use_temp_paths()
+    main([int(i) for i in sys.argv[1:]] or [10_000, 100_000, 500_000])
@@ -0,0 +1,38 @@
+"""Synthetic inventory data for the benchmarks, shaped like the weekly CSV export."""
+
+import numpy as np
+import pandas as pd
+
+from src.constants import *
+
+URL_POOL: list[str] = [
+    "https://v360.in/viewer4.0/vision360.html?d={stock}",
+    "https://diacam360.com/scan.html?d={stock}",
+    "https://cdn.example.com/video/{stock}.mp4",
+    "https://gem360.in/view?d={stock}",
+    "not a url",
+    "",
+]
+
+
+def make_inventory(num_rows: int, num_vendors: int = 150, seed: int = 0) -> pd.DataFrame:
+    """Return a DataFrame with the CSV_* columns plus a few unused columns, as in the real export."""
+    rng = np.random.default_rng(seed)
+    vendor_ids = rng.integers(0, num_vendors, num_rows)
+    stock = pd.Series(rng.integers(1, 10_000_000, num_rows)).astype(str) + rng.choice(["A", "B", "AF"], num_rows)
+
+    url_choice = rng.choice(len(URL_POOL), num_rows, p=[0.6, 0.1, 0.05, 0.05, 0.05, 0.15])
+    urls = [URL_POOL[i].format(stock=s) for i, s in zip(url_choice, stock)]
+
+    return pd.DataFrame(
+        {
+            CSV_VENDOR: [f"VENDOR {i}" for i in vendor_ids],
+            "Shape": rng.choice(["Round", "Oval", "Pear", "Emerald"], num_rows),
+            "Carat": rng.uniform(0.3, 5.0, num_rows).round(2),
+            CSV_URL: pd.Series(urls).replace("", np.nan),
+            CSV_VIDEO: rng.choice(["Y", "N"], num_rows, p=[0.7, 0.3]),
+            CSV_TYPE: np.where(vendor_ids % 3 == 0, "IGI Lab Grown", "GIA"),
+            CSV_STOCK: stock,
+            CSV_CERT: rng.integers(1_000_000, 9_999_999, num_rows),
+        }
+    )
@@ -0,0 +1,24 @@
+"""Keep benchmark runs out of the app's on-disk state, as tests/conftest.py does for the tests."""
+
+import atexit
+import os
+import shutil
+import tempfile
+
+from src import instrument, utils
+
+
+def use_temp_paths() -> str:
+    """Point the sheet id cache, history store, audit outputs and run logs at a temp dir, removed on exit.
+
+    Benchmarks run against fake backends, whose sheet ids and runs must never reach the real caches or history.
+    Returns the temp dir.
+    """
+    tmp = tempfile.mkdtemp(prefix="diamonds_bench_")
+    atexit.register(shutil.rmtree, tmp, ignore_errors=True)
+    utils.SHEET_ID_FILE = os.path.join(tmp, "sheet_ids.yaml")
+    utils.HISTORY_FILE = os.path.join(tmp, "history.sqlite3")
+    utils.OUTPUT_DIR = os.path.join(tmp, "logs", "audits")
+    instrument.LOG_DIR = os.path.join(tmp, "logs")
+    instrument.PROGRESS_FILE = os.path.join(tmp, "logs", "progress.json")
+    return tmp
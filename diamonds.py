@@ -1,25 +1,35 @@
+import time  # noqa
+
+START_TIME = time.perf_counter()  # noqa, does not include the PyInstaller unpacking before Python starts
+
 import multiprocessing  # noqa
 
 multiprocessing.freeze_support()  # noqa
 
+import asyncio
 import logging
+import sys
 import traceback
-from io import StringIO
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Callable
 
-import pandas as pd
 from nicegui import app, events, run, ui, native
 
-from src import utils
+# Only light modules are imported here, src.data and src.ss (pandas, validators, smartsheet) load in the background
+# once the UI is up, see preload_modules
+from src import instrument, utils
 from src.constants import *
 from src.help_md import main_help
-from src.main import Main
+from src.main import Main, import_data
 
+IMPORT_TIME = time.perf_counter() - START_TIME
 LOG_DIR = Path("logs/")
 if not LOG_DIR.exists():
     LOG_DIR.mkdir()
 
+first_paint_logged = False
+
 
 #
 # Launcher functions
@@ -35,18 +45,57 @@ async def run_func(
     audit_name: str = None,
     audit_num: int = 0,
 ) -> None:
-    """Main function for running the user-selected action."""
+    """Main function for running the user-selected action.
+
+    The run is mostly Smartsheet requests, so it runs in a thread of this process: main is not pickled, the state the
+    run sets is kept and progress is read directly. Only the CPU-bound stage goes to main.cpu_pool, see
+    Main.classify_url_video.
+    """
     main.date = date
     main.coverages_sheet_name = coverages_name
     main.audit_sheet_name = audit_name
     main.audit_num = int(audit_num)
 
+    Path(instrument.PROGRESS_FILE).unlink(missing_ok=True)
     waiting.visible = True
-    await run.cpu_bound(func)
+    await run.io_bound(func)
     waiting.visible = False
     final.visible = True
 
 
+async def preload_modules() -> None:
+    """Import the heavy modules in a thread and in the CPU worker after startup, so they are loaded by the first run."""
+
+    def import_modules():
+        from src import data, ss  # noqa: F401
+
+    await run.io_bound(import_modules)
+    try:
+        await asyncio.wrap_future(main.cpu_pool.submit(import_data))  # starts the worker process and its imports
+    except Exception:
+        logging.getLogger(__name__).warning("Preloading src.data in the CPU worker failed", exc_info=True)
+
+
+def shutdown_cpu_pool() -> None:
+    main.cpu_pool.shutdown(cancel_futures=True)
+
+
+def close_clients() -> None:
+    """Close pooled Smartsheet connections, if src.ss was ever loaded."""
+    if "src.ss" in sys.modules:
+        sys.modules["src.ss"].close_clients()
+
+
+def log_first_paint() -> None:
+    """Append this launch's import time and time to first paint (first client connected) to logs/startup.log."""
+    global first_paint_logged
+    if first_paint_logged:
+        return
+    first_paint_logged = True
+    with open(LOG_DIR / "startup.log", "a") as f:
+        f.write(f"{utils.TODAY} imports: {IMPORT_TIME:.2f}s, first paint: {time.perf_counter() - START_TIME:.2f}s\n")
+
+
 def next_action(action: str) -> None:
     """Navigate to the next page. CSV must be uploaded"""
     if main.input_df is not None:
@@ -59,9 +108,18 @@ def next_action(action: str) -> None:
 
 
 def handle_upload(main, e: events.UploadEventArguments):
-    """Parse input file as DataFrame."""
-    with StringIO(e.content.read().decode()) as f:
-        main.input_df = pd.read_csv(f)
+    """Parse input file as DataFrame, straight from the uploaded bytes.
+
+    The previous frame is dropped before parsing and the upload buffer closed after, so neither outlives the upload.
+    """
+    from src import data
+
+    main.input_df = None
+    try:
+        main.input_df = data.read_input_csv(e.content)
+    finally:
+        e.content.close()
+    logging.getLogger(__name__).info("Upload parsed, peak memory %.0f MB", utils.peak_memory_mb())
 
 
 def handle_exception(err):
@@ -107,20 +165,26 @@ def sheet_date_ui():
 
 
 def waiting_diag() -> ui.dialog:
+    """Dialog shown during a run, with the run's current stages and request counts from instrument.PROGRESS_FILE."""
     with ui.dialog() as waiting, ui.card():
         waiting.props("persistent")
         waiting.visible = False
         ui.label("Working, this may take several minutes...")
+        progress = ui.label().classes("text-sm")
+    ui.timer(1.0, lambda: waiting.visible and progress.set_text(instrument.progress_text()))
     waiting.open()
     return waiting
 
 
 def final_diag() -> ui.dialog:
+    """Dialog shown once a run has finished, with the run's time and request counts."""
     with ui.dialog() as final, ui.card():
         final.props("persistent")
         final.visible = False
         ui.label("Finished!")
+        summary = ui.label().classes("text-sm")
         ui.button("Close", on_click=reset_ui)
+    ui.timer(1.0, lambda: final.visible and summary.set_text(instrument.progress_text()))
     final.open()
     return final
 
@@ -198,6 +262,7 @@ def coverages_page():
     with ui.row():
         ss_name = sheet_name(COVERAGES_SHEET_NAME)
         date = sheet_date_ui()
+    ui.switch("Skip Unchanged Vendors?").bind_value(main, "delta_uploads")
 
     ui.button(
         "Run",
@@ -220,6 +285,7 @@ def both_page():
         coverages_name = sheet_name(COVERAGES_SHEET_NAME, "Coverages Sheet")
         audits_name = sheet_name(AUDIT_SHEET_NAME, "Vendor Audits Sheet")
     date = sheet_date_ui()
+    ui.switch("Skip Unchanged Vendors?").bind_value(main, "delta_uploads")
     with ui.row():
         radio = ui.radio({10: "Weekly Audit", 1000: "Deep Dive"}, value=10).props("inline")
         audit_num = ui.number(label="Custom Audit Count").bind_value_from(radio)
@@ -286,5 +352,10 @@ def main_page():
 
 if __name__ == "__main__":
     main = Main()
+    main.cpu_pool = ProcessPoolExecutor(max_workers=1)
     app.on_exception(lambda err: handle_exception(traceback.format_exception(err)))
+    app.on_startup(preload_modules)
+    app.on_connect(log_first_paint)
+    app.on_shutdown(close_clients)
+    app.on_shutdown(shutdown_cpu_pool)
     ui.run(dark=True, reload=False, native=True, port=native.find_open_port())
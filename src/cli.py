@@ -0,0 +1,166 @@
+"""Headless backfill of missed weeks, without the NiceGUI window.
+
+python -m src.cli INPUT_DIR [--since YYYY-MM-DD] [--until YYYY-MM-DD] [--coverages-sheet NAME] [--audit-sheet NAME]
+                  [--audit-num N] [--skip-unchanged] [--workers N] [--chunk-rows N] [--dry-run]
+
+INPUT_DIR holds one inventory CSV per week, named by date, e.g. INPUTS/2024-01-04.csv.
+
+- every CSV is parsed and aggregated in its own process (create_output_df, parse_vendor_audit), in parallel.
+  With --chunk-rows, CSVs are read that many rows at a time (data.stream_outputs), for CSVs too large for memory
+- the Coverages sheet is loaded once for the previous values. Each week's deltas are then chained from the week
+  before locally, see Main.upload_coverages
+- weeks are uploaded oldest first, so the newest rows end up on top as with weekly runs. Weeks on or before the latest
+  date already on the sheet are skipped with a warning, as they would be listed above the newer rows
+"""
+
+import argparse
+import logging
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Final
+
+import pandas as pd
+
+from src import data, instrument
+from src.constants import *
+from src.main import Main
+
+DATED_CSV: Final[re.Pattern] = re.compile(r"(\d{4}-\d{2}-\d{2})\.csv")
+
+logger = logging.getLogger(__name__)
+
+
+def find_dated_csvs(input_dir: str | Path, since: str = None, until: str = None) -> dict[str, Path]:
+    """Return {DATE: path} for the YYYY-MM-DD.csv files in input_dir, oldest first, within since and until."""
+    csvs = {}
+    for path in Path(input_dir).iterdir():
+        match = DATED_CSV.fullmatch(path.name)
+        if match and (not since or match[1] >= since) and (not until or match[1] <= until):
+            csvs[match[1]] = path
+    return dict(sorted(csvs.items()))
+
+
+def prepare_week(
+    path: Path, date: str, audit_num: int = None, chunk_rows: int = None
+) -> tuple[pd.DataFrame, pd.DataFrame | None]:
+    """Parse one CSV and return (coverages output, audit rows). Runs in a worker process, so only results return.
+
+    audit_num: rows per vendor for the audit of every vendor except BE Internal, None to skip the audit
+    chunk_rows: read the CSV this many rows at a time, instead of all at once
+    """
+    if chunk_rows:
+        return data.stream_outputs(path, date, audit_num, chunksize=chunk_rows)
+
+    input_df = data.read_input_csv(path)
+    masks = data.classify_url_video(input_df)
+    output_df = data.create_output_df(input_df, date, masks)
+    if audit_num is None:
+        return output_df, None
+
+    vendors = [i for i in input_df[CSV_VENDOR].dropna().unique() if i != "BE Internal"]
+    return output_df, data.parse_vendor_audit(input_df, vendors, date, audit_num, masks[SS_VIDEO_TRUE])
+
+
+def backfill(
+    input_dir: str | Path,
+    coverages_sheet: str = COVERAGES_SHEET_NAME,
+    audit_sheet: str = None,
+    audit_num: int = 10,
+    since: str = None,
+    until: str = None,
+    skip_unchanged: bool = False,
+    workers: int = None,
+    chunk_rows: int = None,
+    dry_run: bool = False,
+    main: Main = None,
+) -> list[str]:
+    """Parse every dated CSV in parallel, then upload them in date order. Returns the dates uploaded.
+
+    Dates on or before the latest date on the Coverages sheet are skipped, see Main.get_latest_coverage_date.
+
+    audit_sheet: also upload each week's audit of all vendors to this sheet
+    chunk_rows: read each CSV this many rows at a time, see prepare_week
+    dry_run: parse and log the coverages deltas, without uploading anything
+    main: Main to upload with, e.g. one with a fake ss_client
+    """
+    csvs = find_dated_csvs(input_dir, since, until)
+    if not csvs:
+        logger.warning("No YYYY-MM-DD.csv files found in %s", input_dir)
+        return []
+
+    main = main or Main()
+    main.coverages_sheet_name = coverages_sheet
+    main.audit_sheet_name = audit_sheet
+    main.delta_uploads = skip_unchanged
+
+    with instrument.run("backfill"):
+        # Only runs before main.date are read as previous values. No recorded run is after the latest recorded date,
+        # and every week that is uploaded is after it, so the last week loads the previous values for all of them
+        main.date = max(csvs)
+        with instrument.stage("Backfill: fetch sheets"):
+            main.get_coverages_ss()
+            latest = main.get_latest_coverage_date()
+            if audit_sheet and not dry_run:
+                main.get_audit_ss()
+
+        # New child rows are added directly below the parent, so an older week would end up above the newer ones
+        skipped = [date for date in csvs if latest and date <= latest]
+        if skipped:
+            logger.warning("Skipping %s, not after %s, the latest date on the sheet", ", ".join(skipped), latest)
+            csvs = {k: v for k, v in csvs.items() if k not in skipped}
+            if not csvs:
+                return []
+
+        with instrument.stage("Backfill: parse", rows=len(csvs)), ProcessPoolExecutor(workers) as pool:
+            audit_nums = [audit_num if audit_sheet else None] * len(csvs)
+            chunks = [chunk_rows] * len(csvs)
+            weeks = dict(zip(csvs, pool.map(prepare_week, csvs.values(), csvs, audit_nums, chunks)))
+
+        for date, (output_df, audit_df) in weeks.items():
+            main.date = date
+            if dry_run:
+                deltas = data.add_comparison_columns(output_df.copy(), main.ssheet_cov.previous_values)
+                logger.info("%s:\n%s", date, deltas.to_string(index=False))
+                main.ssheet_cov.previous_values.update(data.to_previous_values(output_df))
+                continue
+
+            main.upload_coverages(output_df)
+            if audit_df is not None:
+                with instrument.stage(f"Backfill: audit {date}", rows=len(audit_df)):
+                    main.ssheet_audit.upload_dataframe(audit_df)
+            logger.info("Uploaded %s", date)
+    return list(weeks)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input_dir")
+    parser.add_argument("--since", help="first date to upload, YYYY-MM-DD")
+    parser.add_argument("--until", help="last date to upload, YYYY-MM-DD")
+    parser.add_argument("--coverages-sheet", default=COVERAGES_SHEET_NAME)
+    parser.add_argument("--audit-sheet", help="also upload weekly audits of all vendors to this sheet")
+    parser.add_argument("--audit-num", type=int, default=10)
+    parser.add_argument("--skip-unchanged", action="store_true", help="skip vendors unchanged since the week before")
+    parser.add_argument("--workers", type=int, help="parsing processes, defaults to the number of CPUs")
+    parser.add_argument("--chunk-rows", type=int, help="read CSVs this many rows at a time, for very large CSVs")
+    parser.add_argument("--dry-run", action="store_true", help="log the deltas without uploading")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    backfill(
+        args.input_dir,
+        args.coverages_sheet,
+        args.audit_sheet,
+        args.audit_num,
+        args.since,
+        args.until,
+        args.skip_unchanged,
+        args.workers,
+        args.chunk_rows,
+        args.dry_run,
+    )
+
+
+if __name__ == "__main__":
+    main()
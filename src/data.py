@@ -1,8 +1,52 @@
+import importlib.util
+import re
+from typing import IO, Final
+
+import numpy as np
 import pandas as pd
 import validators
 
 from src.constants import *
 
+pd.options.mode.chained_assignment = None  # default='warn'
+
+URL_TEST_PATTERN: Final[re.Pattern] = re.compile("|".join(re.escape(i) for i in URL_TEST_STRINGS))
+
+# Rows per chunk for stream_outputs
+CHUNK_ROWS: Final[int] = 100_000
+# pyarrow is optional, its parser is multithreaded and its strings are stored in compact buffers, not as str objects
+CSV_ENGINE: Final[str] = "pyarrow" if importlib.util.find_spec("pyarrow") else "c"
+STRING_DTYPE: Final[str] = "string[pyarrow]" if CSV_ENGINE == "pyarrow" else "string"
+
+# Only these CSV columns are used. Video Upload is Y/N, so it is compared against "Y" rather than cast to bool.
+# URLs stay object, classify_url_video needs them as str objects anyway
+INPUT_DTYPES: Final[dict[str, str]] = {
+    CSV_VENDOR: "category",
+    CSV_URL: "object",
+    CSV_VIDEO: "category",
+    CSV_TYPE: "category",
+    CSV_STOCK: STRING_DTYPE,
+    CSV_CERT: STRING_DTYPE,
+}
+# Previous values compared by split_unchanged, {PREV VALUE NAME: SS_COL_NAME}
+DELTA_COLS: Final[dict[str, str]] = {
+    "Prev Video": SS_VIDEO_TRUE,
+    "Prev Total": SS_VIDEO_INV,
+    "Prev Valid": SS_VALID_URLS,
+    "Prev Blank": SS_BLANK_URLS,
+}
+# Previous values loaded for add_comparison_columns and split_unchanged, {PREV VALUE NAME: SS_COL_NAME}
+PREVIOUS_COLS: Final[dict[str, str]] = {"Prev Inven": SS_PERC_INV, **DELTA_COLS}
+
+
+def read_input_csv(source: str | IO[bytes], engine: str = CSV_ENGINE) -> pd.DataFrame:
+    """Read the inventory CSV from a path or binary file object, e.g. the upload, without decoding it to a str first.
+
+    Only the INPUT_DTYPES columns are loaded, with those dtypes instead of inferred ones. The result is treated as
+    read-only by everything downstream, so it can be shared by both pipelines without copies.
+    """
+    return pd.read_csv(source, usecols=list(INPUT_DTYPES), dtype=INPUT_DTYPES, engine=engine)
+
 
 def bool_fields_test(test_val: bool, reverse: bool):
     """Convert values to bool or pd.NA. Intent is to put valids in one Series and invalids in another,
@@ -38,9 +82,37 @@ def check_url_field(url: str, reverse: bool):
     return bool_fields_test(test, reverse)
 
 
-def create_output_df(df: pd.DataFrame, date: str) -> pd.DataFrame:
+def classify_url_video(df: pd.DataFrame) -> pd.DataFrame:
+    """Vectorized version of check_url_field and check_video_field, computing all four masks in one pass.
+
+    Returns a DataFrame aligned to df.index with bool columns Valid V360, Blank/Invalid, Has Video and No Video.
+
+    - cheap string ops drop URLs that are short, non-str, have no scheme or contain one of URL_TEST_STRINGS
+    - validators.url is only run once per remaining unique URL, as it cannot be vectorized
+    """
+    urls = df[CSV_URL]
+    if urls.dtype.kind != "O":  # e.g. an all blank column is read in as float
+        urls = urls.astype(object)
+    has_test_string = urls.str.contains(URL_TEST_PATTERN, na=True).astype(bool)
+    has_scheme = urls.str.contains("://", regex=False, na=False).astype(bool)
+    candidates = (urls.str.len() >= 6) & has_scheme & ~has_test_string
+
+    candidate_urls = urls[candidates]
+    url_checks = {url: bool(validators.url(url)) for url in candidate_urls.unique()}
+    valid = pd.Series(False, index=df.index)
+    valid[candidates] = candidate_urls.map(url_checks).astype(bool).to_numpy()
+
+    has_video = (df[CSV_VIDEO] == "Y").fillna(False).astype(bool)
+    return pd.DataFrame(
+        {SS_VALID_URLS: valid, SS_BLANK_URLS: ~valid, SS_VIDEO_TRUE: has_video, SS_VIDEO_FALSE: ~has_video}
+    )
+
+
+def create_output_df(df: pd.DataFrame, date: str, masks: pd.DataFrame = None) -> pd.DataFrame:
     """Load fields from CSV and group (sum) by Vendor.
 
+    masks: classify_url_video(df), if already computed
+
     From CSV:
     - Video URL from Vendor: expected to be URLs or blank
     - Video Upload: expected to be Y or N
@@ -50,10 +122,59 @@ def create_output_df(df: pd.DataFrame, date: str) -> pd.DataFrame:
     - Blank/Invalid: count of invalid URLs
     - Has Video: count of 'Y's in Video Upload
     - No Video: count of not 'Y's in Video Upload
+    - Total Inv: count of non-blank Video Upload values
+    - Type: coerced Cert of Origin of the vendor's first row
     - % inv. w/ video: % of inventory with 'Y' in Video Upload. This will be coerced to a percent string later,
         but is needed for comparisons in add_columns()
     - % Inv w/ URLs: % of inventory with URLs. Not needed for any comparisons
+
+    Counts are taken by count_vendors, see there.
     """
+    return output_from_counts(count_vendors(df, masks), date)
+
+
+def count_vendors(df: pd.DataFrame, masks: pd.DataFrame = None) -> pd.DataFrame:
+    """Per-vendor counts for create_output_df, indexed by vendor, with the raw CSV_TYPE of each vendor's first row.
+
+    Counts are taken in a single pass with np.bincount over the vendor codes, so df is neither copied nor modified.
+    Rows without a vendor are dropped and vendors are sorted, as groupby would. Counts of several parts of a CSV can
+    be combined with merge_vendor_counts.
+    """
+    if masks is None:
+        masks = classify_url_video(df)
+    codes, vendors = pd.factorize(df[CSV_VENDOR], sort=True)  # categorical vendors are factorized on their codes
+    has_vendor = codes >= 0
+
+    def count(mask: pd.Series) -> np.ndarray:
+        return np.bincount(codes[has_vendor & mask.to_numpy()], minlength=len(vendors))
+
+    first_rows = pd.Series(codes)[has_vendor].drop_duplicates()  # index is the first row position of each vendor
+    types = pd.Series(df[CSV_TYPE].to_numpy()[first_rows.index], index=first_rows.to_numpy()).sort_index()
+
+    return pd.DataFrame(
+        {
+            SS_VALID_URLS: count(masks[SS_VALID_URLS]),
+            SS_BLANK_URLS: count(masks[SS_BLANK_URLS]),
+            SS_VIDEO_TRUE: count(masks[SS_VIDEO_TRUE]),
+            SS_VIDEO_FALSE: count(masks[SS_VIDEO_FALSE]),
+            SS_VIDEO_INV: count(df[CSV_VIDEO].notna()),
+            CSV_TYPE: types.to_numpy(dtype=object),
+        },
+        index=pd.Index(np.asarray(vendors, dtype=object), name=SS_VENDOR),
+    )
+
+
+def merge_vendor_counts(first: pd.DataFrame, second: pd.DataFrame) -> pd.DataFrame:
+    """Combine count_vendors of two consecutive parts of a CSV: counts are summed, the first part's type is kept."""
+    counts = pd.concat([first, second])
+    types = counts.loc[~counts.index.duplicated(), CSV_TYPE]
+    merged = counts.drop(columns=CSV_TYPE).groupby(level=0, sort=True).sum()
+    merged[CSV_TYPE] = types
+    return merged
+
+
+def output_from_counts(counts: pd.DataFrame, date: str) -> pd.DataFrame:
+    """Build the create_output_df output from count_vendors."""
 
     def check_type_field(type_val: str | None) -> str:
         """Check the CSV_TYPE field and coerce to correct value."""
@@ -63,26 +184,15 @@ def create_output_df(df: pd.DataFrame, date: str) -> pd.DataFrame:
             return "Natural"
         return ""
 
-    df[SS_VALID_URLS] = df[CSV_URL].apply(check_url_field, args=(False,))
-    df[SS_BLANK_URLS] = df[CSV_URL].apply(check_url_field, args=(True,))
-    df[SS_VIDEO_TRUE] = df[CSV_VIDEO].apply(check_video_field, args=(False,))
-    df[SS_VIDEO_FALSE] = df[CSV_VIDEO].apply(check_video_field, args=(True,))
-
-    df_type = df[[CSV_VENDOR, CSV_TYPE]].drop_duplicates(CSV_VENDOR)
-    df = df[[CSV_VENDOR, SS_VALID_URLS, SS_BLANK_URLS, SS_VIDEO_TRUE, SS_VIDEO_FALSE, CSV_VIDEO]]
+    out = counts.drop(columns=CSV_TYPE).reset_index()
+    out[SS_TYPE] = [check_type_field(i) for i in counts[CSV_TYPE]]
+    out[SS_DATE] = date
 
-    df = df.groupby(CSV_VENDOR, as_index=False).count()
-    df = pd.merge(df, df_type, on=CSV_VENDOR)
-    df[SS_DATE] = date
-    df[CSV_TYPE] = df[CSV_TYPE].apply(lambda x: check_type_field(x))
+    out[SS_PERC_INV] = 1 - ((out[SS_VIDEO_INV] - out[SS_VIDEO_TRUE]) / out[SS_VIDEO_INV])
+    out[SS_PERC_INV_URL] = (1 - ((out[SS_VIDEO_INV] - out[SS_VALID_URLS]) / out[SS_VIDEO_INV])).round(4)
 
-    df.rename(columns={CSV_VIDEO: SS_VIDEO_INV, CSV_VENDOR: SS_VENDOR, CSV_TYPE: SS_TYPE}, inplace=True)
-
-    df[SS_PERC_INV] = 1 - ((df[SS_VIDEO_INV] - df[SS_VIDEO_TRUE]) / df[SS_VIDEO_INV])
-    df[SS_PERC_INV_URL] = (1 - ((df[SS_VIDEO_INV] - df[SS_VALID_URLS]) / df[SS_VIDEO_INV])).round(4)
-
-    df.fillna("", inplace=True)
-    return df
+    out.fillna("", inplace=True)
+    return out
 
 
 """
@@ -106,9 +216,11 @@ def add_comparison_columns(df: pd.DataFrame, new_data: dict) -> pd.DataFrame:
     """
 
     def convert_str_to_float(df: pd.DataFrame, column: str) -> None:
-        """Convert string percent to float"""
+        """Convert string percents to float. Values may be mixed, e.g. floats from the history store or a chained run"""
         if df[column].dtype != "float64":
-            df[column] = df[column].str.rstrip("%").astype("float") / 100.0
+            is_str = df[column].map(lambda i: isinstance(i, str)).astype(bool)
+            df[column] = df[column].where(~is_str, df.loc[is_str, column].str.rstrip("%").astype("float") / 100.0)
+            df[column] = df[column].astype("float")
 
     if new_data:  # should only be empty if new sheet
         new_df = pd.DataFrame.from_dict(new_data, orient="index")
@@ -128,44 +240,116 @@ def add_comparison_columns(df: pd.DataFrame, new_data: dict) -> pd.DataFrame:
         df[SS_VID_INV_DELTA] = (df[SS_PERC_INV] - df["Prev Inven"]).round(4)
         df[SS_PERC_INV] = df[SS_PERC_INV].round(4)
 
-        df.drop(["Prev Video", "Prev Inven"], axis="columns", inplace=True)
+        df.drop(new_df.columns, axis="columns", inplace=True)  # also drops any other previous values, e.g. DELTA_COLS
         df.fillna("", inplace=True)
     return df
 
 
-def parse_vendor_audit(df: pd.DataFrame, vendors: list[str], date: str, num_values: int) -> pd.DataFrame:
-    """Create Vendor Audit DataFrame from raw CSV dataframe.
+def to_previous_values(df: pd.DataFrame) -> dict[str, dict]:
+    """Return create_output_df values as previous values, i.e. {VENDOR: {PREV VALUE NAME: val}} for PREVIOUS_COLS.
 
-    - Drop unneeded columns, filter for the vendors selected
-    - sort by descending values by the Stock number, split for the num_values
-    - concat into one DF and return
+    Used to chain runs without reading the values back from Smartsheet. % inv. w/ video is rounded as uploaded.
     """
+    prev_df = df.set_index(SS_VENDOR)[list(PREVIOUS_COLS.values())].round({SS_PERC_INV: 4})
+    prev_df.columns = list(PREVIOUS_COLS)
+    return prev_df.to_dict(orient="index")
+
 
-    def sort_filter_df(df: pd.DataFrame) -> pd.DataFrame:
-        """Return sorted DF in descending order.
+def split_unchanged(df: pd.DataFrame, new_data: dict) -> tuple[pd.DataFrame, list[str]]:
+    """Split the output of create_output_df into vendors whose metrics changed since the previous run, and the rest.
 
-        - create a temp column and put the stock numbers in it, removing any letters and coercing to int
-        - Stock #'s are expected to be alphanumeric, with only trailing letters
-        """
-        df['temp_stock'] = df[CSV_STOCK].replace(to_replace="[A-Za-z]", value="", regex=True).astype(int)
+    new_data: previous values, as for add_comparison_columns, holding the DELTA_COLS keys
+    return: (DF of changed or new vendors, list of unchanged vendor names)
 
-        df = df.sort_values(by='temp_stock', ascending=False)[:num_values]
-        df.drop(columns=['temp_stock'], inplace=True)
-        return df
+    A vendor is unchanged only if every DELTA_COLS value equals its previous value. Values from SS may be float or
+    str, so they are compared numerically.
+    """
+    prev_df = pd.DataFrame.from_dict(new_data, orient="index").reindex(index=df[SS_VENDOR], columns=list(DELTA_COLS))
+    unchanged = np.ones(len(df), dtype=bool)
+    for prev_col, col in DELTA_COLS.items():
+        prev_vals = pd.to_numeric(prev_df[prev_col], errors="coerce").to_numpy()
+        unchanged &= df[col].to_numpy() == prev_vals
 
-    df = df[df[CSV_VIDEO] == "Y"]  # only values with video upload == Y should be used
-    clean_df = df[[CSV_VENDOR, CSV_URL, CSV_STOCK, CSV_CERT]]
+    return df[~unchanged], df.loc[unchanged, SS_VENDOR].tolist()
 
-    for i, vendor in enumerate(vendors):
-        vendor_df = clean_df.loc[df[CSV_VENDOR] == vendor]
-        if i == 0:
-            sorted_full_df = sort_filter_df(vendor_df)
-        else:
-            sorted_full_df = pd.concat([sorted_full_df, sort_filter_df(vendor_df)])
 
-    sorted_full_df.rename(
+def parse_vendor_audit(
+    df: pd.DataFrame, vendors: list[str], date: str, num_values: int, has_video: pd.Series = None
+) -> pd.DataFrame:
+    """Create Vendor Audit DataFrame from raw CSV dataframe.
+
+    has_video: the Has Video mask from classify_url_video(df), if already computed
+
+    - Drop unneeded columns, filter for the vendors selected and for Video Upload == Y in one mask
+    - Stock #'s are expected to be alphanumeric, with only trailing letters. The numeric part is used as the sort key
+    - one stable sort by (order in vendors, descending stock key), then the first num_values rows of each vendor
+    """
+    return audit_output(select_audit_rows(df, vendors, num_values, has_video), date)
+
+
+def select_audit_rows(
+    df: pd.DataFrame, vendors: list[str], num_values: int, has_video: pd.Series = None, top: pd.DataFrame = None
+) -> pd.DataFrame:
+    """Return the first num_values audit rows of each vendor, in audit order and with the CSV column names.
+
+    top: select_audit_rows of the earlier parts of the same CSV. Its rows rank ahead of df's on equal stock keys, as
+         they come first in the CSV, so selecting part by part gives the same rows as one call on the whole CSV
+    """
+    if has_video is None:
+        has_video = (df[CSV_VIDEO] == "Y").fillna(False).astype(bool)
+    selected = df[CSV_VENDOR].isin(vendors) & has_video
+    audit_df = df.loc[selected, [CSV_VENDOR, CSV_URL, CSV_STOCK, CSV_CERT]]
+    if top is not None:
+        audit_df = pd.concat([top, audit_df])
+
+    stock_key = audit_df[CSV_STOCK].replace(to_replace="[A-Za-z]", value="", regex=True).astype(int).to_numpy()
+    vendor_order = pd.Index(list(dict.fromkeys(vendors))).get_indexer(audit_df[CSV_VENDOR].astype(object))
+    order = np.lexsort((-stock_key, vendor_order))  # last key is the primary key
+    return audit_df.iloc[order].groupby(vendor_order[order], sort=False).head(num_values)
+
+
+def audit_output(audit_df: pd.DataFrame, date: str) -> pd.DataFrame:
+    """Rename select_audit_rows to the Smartsheet columns and add the date."""
+    audit_df[CSV_VENDOR] = audit_df[CSV_VENDOR].astype(object)  # categorical from read_input_csv
+    audit_df.rename(
         columns={CSV_VENDOR: SS_VENDOR, CSV_URL: SS_VIDEO_LINK, CSV_STOCK: SS_STOCK, CSV_CERT: SS_CERT}, inplace=True
     )
-    sorted_full_df[SS_DATE] = date
-    sorted_full_df.fillna("", inplace=True)
-    return sorted_full_df
+    audit_df[SS_DATE] = date
+    audit_df.fillna("", inplace=True)
+    return audit_df
+
+
+def read_input_csv_chunks(source: str | IO[bytes], chunksize: int = CHUNK_ROWS) -> "pd.io.parsers.TextFileReader":
+    """read_input_csv, chunksize rows at a time. The pyarrow engine cannot read in chunks, so the c engine is used."""
+    return pd.read_csv(source, usecols=list(INPUT_DTYPES), dtype=INPUT_DTYPES, engine="c", chunksize=chunksize)
+
+
+def stream_outputs(
+    source: str | IO[bytes], date: str, num_values: int = None, vendors: list[str] = None, chunksize: int = CHUNK_ROWS
+) -> tuple[pd.DataFrame, pd.DataFrame | None]:
+    """Out-of-core create_output_df and parse_vendor_audit, for CSVs too large to load at once.
+
+    num_values: audit rows per vendor, None to skip the audit
+    vendors: vendors to audit, defaults to every vendor except BE Internal in order of appearance, as Main.csv_vendors
+    return: (create_output_df output, parse_vendor_audit output or None), the same as the in-memory functions
+
+    Each chunk is reduced to per-vendor counts and the top num_values rows per vendor, and merged into the totals of
+    the chunks before it. Memory is bounded by chunksize plus one row of counts and num_values rows per vendor.
+    """
+    all_vendors = vendors is None
+    vendors = [] if all_vendors else vendors
+    counts, top = None, None
+    with read_input_csv_chunks(source, chunksize) as chunks:
+        for chunk in chunks:
+            masks = classify_url_video(chunk)
+            chunk_counts = count_vendors(chunk, masks)
+            counts = chunk_counts if counts is None else merge_vendor_counts(counts, chunk_counts)
+            if num_values is None:
+                continue
+            if all_vendors:
+                new = [i for i in chunk[CSV_VENDOR].dropna().unique() if i != "BE Internal"]
+                vendors = list(dict.fromkeys([*vendors, *new]))
+            top = select_audit_rows(chunk, vendors, num_values, masks[SS_VIDEO_TRUE], top)
+
+    output_df = output_from_counts(counts, date)
+    return output_df, None if num_values is None else audit_output(top, date)
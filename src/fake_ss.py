@@ -0,0 +1,313 @@
+"""In-process stand-in for the Smartsheet API, used by the tests and benchmarks.
+
+FakeSmartsheet is a requests transport adapter. It is mounted on a real smartsheet.Smartsheet client, so the SDK
+(serialization, models, error handling and retries) runs unchanged and only the HTTP round trip is faked:
+
+    fake = FakeSmartsheet(latency=0.05)
+    fake.add_sheet("Colorless Diamond Audit", ["Vendor", "Video Link", "Stock Number", "Cert Number", "Date"])
+    ssheet = ss.SSheet(client=fake.client())
+
+Supported endpoints: list sheets, get sheet (columnIds, rowIds, pageSize, page), get sheet version, get columns and
+add rows (parentId, toTop, toBottom).
+
+As on Smartsheet, writes to one sheet are serialized: an add rows request that overlaps another one to the same sheet
+is answered with a 409 (errorCode 4004), which the SDK retries with backoff.
+"""
+
+import itertools
+import json
+import re
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+import smartsheet
+from requests.adapters import BaseAdapter
+
+FAKE_API_BASE = "https://fake.smartsheet.local/2.0"
+
+
+class FakeSmartsheet(BaseAdapter):
+    """Fake Smartsheet backend.
+
+    latency: seconds slept on every request, to stand in for the HTTP round trip
+    rate_limit: requests allowed per rolling minute before answering 429 (errorCode 4003) with a Retry-After header
+    throttle_every: additionally answer every Nth request with a 429, for deterministic throttling
+    """
+
+    def __init__(self, latency: float = 0.0, rate_limit: int = None, throttle_every: int = None) -> None:
+        super().__init__()
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.throttle_every = throttle_every
+
+        self.sheets: dict[int, dict] = {}
+        self.request_count = 0
+        self.throttled_count = 0
+        self.conflict_count = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+        self._ids = itertools.count(1000)
+        self._request_times: list[float] = []
+        self._writing: set[int] = set()  # sheets with an add rows request in progress
+        self._lock = threading.Lock()
+
+    #
+    # Setup
+    #
+
+    def client(self, access_token: str = "fake-token", **kwargs) -> smartsheet.Smartsheet:
+        """Return an SDK client that sends all of its requests to this backend."""
+        client = smartsheet.Smartsheet(access_token, api_base=FAKE_API_BASE, **kwargs)
+        client._session.mount(FAKE_API_BASE, self)
+        return client
+
+    def add_sheet(self, name: str, column_titles: list[str]) -> int:
+        """Create an empty sheet, the first column is the primary column. Returns the sheet id."""
+        sheet_id = next(self._ids)
+        columns = [
+            {"id": next(self._ids), "index": i, "title": title, "type": "TEXT_NUMBER", "primary": i == 0}
+            for i, title in enumerate(column_titles)
+        ]
+        self.sheets[sheet_id] = {"id": sheet_id, "name": name, "version": 1, "columns": columns, "rows": []}
+        return sheet_id
+
+    def seed_rows(self, sheet_id: int, rows: list[dict], parent_id: int = None) -> list[int]:
+        """Append rows given as {column title: value} directly, without counting a request. Returns the row ids."""
+        sheet = self.sheets[sheet_id]
+        col_ids = {col["title"]: col["id"] for col in sheet["columns"]}
+        new_rows = [
+            {
+                "id": next(self._ids),
+                "parentId": parent_id,
+                "cells": {col_ids[title]: value for title, value in row.items()},
+            }
+            for row in rows
+        ]
+        self._insert_rows(sheet, new_rows, {"parentId": parent_id, "toBottom": True})
+        return [row["id"] for row in new_rows]
+
+    def sheet_values(self, sheet_id: int) -> list[dict]:
+        """Return the rows of a sheet as {column title: value}, plus the parent's primary value under `_parent`."""
+        sheet = self.sheets[sheet_id]
+        titles = {col["id"]: col["title"] for col in sheet["columns"]}
+        primary = sheet["columns"][0]["id"]
+        by_id = {row["id"]: row for row in sheet["rows"]}
+        values = []
+        for row in sheet["rows"]:
+            row_values = {titles[col_id]: val for col_id, val in row["cells"].items()}
+            if row["parentId"]:
+                row_values["_parent"] = by_id[row["parentId"]]["cells"].get(primary)
+            values.append(row_values)
+        return values
+
+    #
+    # Transport
+    #
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        body = request.body or b""
+        if isinstance(body, str):
+            body = body.encode()
+
+        write_sheet = self._write_target(request.method, request.url)
+
+        with self._lock:
+            self.request_count += 1
+            self.bytes_sent += len(body)
+            throttled = self._throttled()
+            self.throttled_count += bool(throttled)
+            conflict = not throttled and write_sheet in self._writing
+            self.conflict_count += conflict
+            writing = write_sheet is not None and not throttled and not conflict
+            if writing:
+                self._writing.add(write_sheet)
+
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+
+            headers = {}
+            if throttled:
+                status, payload, headers = 429, {"errorCode": 4003, "message": "Rate limit exceeded."}, throttled
+            elif conflict:
+                status, payload = 409, {
+                    "errorCode": 4004,
+                    "message": f"Request failed because sheetId {write_sheet} is currently being updated by another "
+                    "request that uses the same access token. Please retry your request once the previous request "
+                    "has completed.",
+                }
+            else:
+                with self._lock:
+                    status, payload = self._route(request.method, request.url, body)
+        finally:
+            if writing:
+                with self._lock:
+                    self._writing.discard(write_sheet)
+
+        if status >= 400:
+            payload = {**payload, "refId": "fake"}  # every API error has one, SDK 3 fails to parse errors without it
+        response = requests.Response()
+        response.status_code = status
+        response._content = json.dumps(payload).encode()
+        response.headers.update({"Content-Type": "application/json;charset=UTF-8", **headers})
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        response.reason = "OK" if status < 300 else "Error"
+        with self._lock:
+            self.bytes_received += len(response._content)
+        return response
+
+    def close(self) -> None:
+        ...
+
+    def _throttled(self) -> dict | None:
+        """Return Retry-After headers if this request should be throttled. Called under the lock."""
+        if self.throttle_every and self.request_count % self.throttle_every == 0:
+            return {"Retry-After": "1"}
+
+        if self.rate_limit:
+            now = time.monotonic()
+            self._request_times = [i for i in self._request_times if now - i < 60]
+            if len(self._request_times) >= self.rate_limit:
+                return {"Retry-After": str(max(1, round(60 - (now - self._request_times[0]))))}
+            self._request_times.append(now)
+        return None
+
+    @staticmethod
+    def _write_target(method: str, url: str) -> int | None:
+        """Return the sheet id of an add rows request, None for other requests."""
+        path = urlsplit(url).path.removeprefix(urlsplit(FAKE_API_BASE).path)
+        match = re.fullmatch(r"/sheets/(\d+)/rows", path)
+        return int(match[1]) if match and method == "POST" else None
+
+    def _route(self, method: str, url: str, body: bytes) -> tuple[int, dict]:
+        parts = urlsplit(url)
+        path = parts.path.removeprefix(urlsplit(FAKE_API_BASE).path)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+
+        if method == "GET" and path == "/sheets":
+            return 200, self._list_sheets()
+
+        match = re.fullmatch(r"/sheets/(\d+)(/columns|/rows|/version)?", path)
+        if not match or int(match[1]) not in self.sheets:
+            return 404, {"errorCode": 1006, "message": "Not Found"}
+        sheet = self.sheets[int(match[1])]
+
+        if method == "GET" and match[2] is None:
+            return 200, self._get_sheet(sheet, query)
+        if method == "GET" and match[2] == "/columns":
+            return 200, self._index_result(sheet["columns"])
+        if method == "GET" and match[2] == "/version":
+            return 200, {"version": sheet["version"]}
+        if method == "POST" and match[2] == "/rows":
+            return self._add_rows(sheet, json.loads(body))
+        return 405, {"errorCode": 1000, "message": "Method not supported by FakeSmartsheet."}
+
+    #
+    # Endpoints
+    #
+
+    @staticmethod
+    def _index_result(data: list) -> dict:
+        return {"pageNumber": 1, "pageSize": len(data), "totalPages": 1, "totalCount": len(data), "data": data}
+
+    def _list_sheets(self) -> dict:
+        return self._index_result([{"id": i["id"], "name": i["name"]} for i in self.sheets.values()])
+
+    def _get_sheet(self, sheet: dict, query: dict) -> dict:
+        columns = sheet["columns"]
+        if "columnIds" in query:
+            col_ids = {int(i) for i in query["columnIds"].split(",")}
+            columns = [col for col in columns if col["id"] in col_ids]
+        col_ids = [col["id"] for col in columns]
+
+        rows = [(i, row) for i, row in enumerate(sheet["rows"], 1)]
+        if "rowIds" in query:
+            row_ids = {int(i) for i in query["rowIds"].split(",")}
+            rows = [(i, row) for i, row in rows if row["id"] in row_ids]
+        if "pageSize" in query:
+            page_size, page = int(query["pageSize"]), int(query.get("page", 1))
+            rows = rows[(page - 1) * page_size : page * page_size]
+
+        return {
+            "id": sheet["id"],
+            "name": sheet["name"],
+            "version": sheet["version"],
+            "totalRowCount": len(sheet["rows"]),
+            "columns": columns,
+            "rows": [
+                self._row_json(row, number, col_ids, "nonexistentCells" in query.get("exclude", ""))
+                for number, row in rows
+            ],
+        }
+
+    @staticmethod
+    def _row_json(row: dict, row_number: int, col_ids: list[int], exclude_empty: bool = False) -> dict:
+        cells = [{"columnId": col_id, "value": row["cells"].get(col_id)} for col_id in col_ids]
+        if exclude_empty:
+            cells = [cell for cell in cells if cell["value"] is not None]
+        row_json = {"id": row["id"], "rowNumber": row_number, "cells": cells}
+        if row["parentId"]:
+            row_json["parentId"] = row["parentId"]
+        for cell in row_json["cells"]:
+            if cell["value"] is None:
+                del cell["value"]
+            else:
+                cell["displayValue"] = str(cell["value"])
+        return row_json
+
+    def _add_rows(self, sheet: dict, rows: list[dict]) -> tuple[int, dict]:
+        if isinstance(rows, dict):
+            rows = [rows]
+        location_keys = ("parentId", "toTop", "toBottom", "siblingId", "above")
+        locations = {tuple(row.get(key) for key in location_keys) for row in rows}
+        if len(locations) > 1:
+            return 400, {"errorCode": 1062, "message": "All rows must have the same location attributes."}
+
+        location = dict(zip(location_keys, locations.pop()))
+        col_ids = {col["id"] for col in sheet["columns"]}
+        if location["parentId"] and not any(row["id"] == location["parentId"] for row in sheet["rows"]):
+            return 404, {"errorCode": 1006, "message": "Not Found"}
+
+        new_rows = []
+        for row in rows:
+            cells = {}
+            for cell in row.get("cells", []):
+                if cell["columnId"] not in col_ids:
+                    return 400, {"errorCode": 1036, "message": f"Column {cell['columnId']} does not exist."}
+                cells[cell["columnId"]] = cell.get("value")
+            new_rows.append({"id": next(self._ids), "parentId": location["parentId"], "cells": cells})
+
+        self._insert_rows(sheet, new_rows, location)
+        sheet["version"] += 1
+        positions = {row["id"]: i for i, row in enumerate(sheet["rows"], 1)}
+        all_cols = [col["id"] for col in sheet["columns"]]
+        return 200, {
+            "message": "SUCCESS",
+            "resultCode": 0,
+            "version": sheet["version"],
+            "result": [self._row_json(row, positions[row["id"]], all_cols) for row in new_rows],
+        }
+
+    @staticmethod
+    def _insert_rows(sheet: dict, new_rows: list[dict], location: dict) -> None:
+        """Insert at the location; without toTop rows go to the bottom, of the parent's children if parentId is set."""
+        rows = sheet["rows"]
+        parent_id = location.get("parentId")
+        if parent_id:
+            parent_pos = next(i for i, row in enumerate(rows) if row["id"] == parent_id)
+            if location.get("toTop"):
+                insert_at = parent_pos + 1
+            else:
+                descendants = {parent_id}
+                insert_at = parent_pos + 1
+                while insert_at < len(rows) and rows[insert_at]["parentId"] in descendants:
+                    descendants.add(rows[insert_at]["id"])
+                    insert_at += 1
+        else:
+            insert_at = 0 if location.get("toTop") else len(rows)
+        rows[insert_at:insert_at] = new_rows
@@ -40,8 +40,9 @@ Please direct all issues and questions to Mickey Avila (mickey.avila@brilliantea
 5. Next, the script will retrieve values from Smartsheet for comparison to the previous script uploads:
   - The main assumption made is that the first (from the top) child row for each vendor is the most recent
   - *{SS_INV_DELTA}* and *{SS_VID_INV_DELTA}* are calcuated using the new values compared to the previous iteration's data from Smartsheet
+  - If 'Skip Unchanged Vendors' is selected, vendors whose *{SS_VIDEO_TRUE}*, *{SS_VIDEO_INV}*, *{SS_VALID_URLS}* and *{SS_BLANK_URLS}* all match the previous iteration are not uploaded
 6. Finally, all of the new data is loaded to Smartsheet. Each vendor's new row is loaded as a 'child' row, immediately below the parent
-  - Note: Because of the parent/child rows being used, the data must be loaded row-by-row (Smartsheet limitation) and is therefore not very performant
+  - Note: Smartsheet only adds rows under one parent per request, so each vendor's rows go out in their own request. All new vendors are added together in a single request
 
 ##### Vendor Audit Script
 1. A CSV input file is uploaded
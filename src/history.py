@@ -0,0 +1,96 @@
+"""Local store of every coverages run, used for the previous-run values instead of reading them back from the sheet.
+
+Kept in sqlite at utils.HISTORY_FILE:
+  - coverage: one row per (sheet, vendor, date), with the create_output_df values
+  - sheets: the sheet version after our last successful upload to each sheet
+
+A sheet's runs are only trusted while the sheet is still at the recorded version, i.e. nobody else has changed it
+since. Runs are kept per sheet, so uploads to another coverages sheet never become this sheet's previous values.
+"""
+
+import sqlite3
+from contextlib import closing
+from typing import Final
+
+import pandas as pd
+
+from src import utils
+from src.constants import *
+
+# {SS_COL_NAME: column in the coverage table}
+HISTORY_COLS: Final[dict[str, str]] = {
+    SS_VALID_URLS: "valid_urls",
+    SS_BLANK_URLS: "blank_urls",
+    SS_VIDEO_TRUE: "has_video",
+    SS_VIDEO_FALSE: "no_video",
+    SS_VIDEO_INV: "total_inv",
+    SS_TYPE: "type",
+    SS_PERC_INV: "perc_inv",
+    SS_PERC_INV_URL: "perc_inv_url",
+}
+
+SCHEMA: Final[str] = f"""
+CREATE TABLE IF NOT EXISTS coverage (
+    sheet_id INTEGER NOT NULL,
+    vendor TEXT NOT NULL,
+    date TEXT NOT NULL,
+    {", ".join(HISTORY_COLS.values())},
+    PRIMARY KEY (sheet_id, vendor, date)
+);
+CREATE TABLE IF NOT EXISTS sheets (sheet_id INTEGER PRIMARY KEY, version INTEGER NOT NULL);
+"""
+
+
+def connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(utils.HISTORY_FILE)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def save_run(df: pd.DataFrame, date: str, sheet_id: int, sheet_version: int) -> None:
+    """Store a run's create_output_df values, replacing any earlier run to the sheet for the same date, and the sheet
+    version.
+
+    Both are written in one transaction, so the version never marks a run that was not stored. The % inv. w/ video
+    value is rounded as on the sheet.
+    """
+    cols = list(HISTORY_COLS)
+    df = df[[SS_VENDOR, *cols]].round({SS_PERC_INV: 4})
+    rows = [(sheet_id, vendor, date, *vals) for vendor, *vals in df.itertuples(index=False)]
+    placeholders = ", ".join("?" * (len(cols) + 3))
+    with closing(connect()) as conn, conn:
+        conn.execute("DELETE FROM coverage WHERE sheet_id = ? AND date = ?", (sheet_id, date))
+        conn.executemany(f"INSERT INTO coverage VALUES ({placeholders})", rows)
+        conn.execute("INSERT OR REPLACE INTO sheets VALUES (?, ?)", (sheet_id, sheet_version))
+
+
+def load_sheet_version(sheet_id: int) -> int | None:
+    """Return the sheet version recorded by save_run, or None."""
+    with closing(connect()) as conn:
+        row = conn.execute("SELECT version FROM sheets WHERE sheet_id = ?", (sheet_id,)).fetchone()
+    return row[0] if row else None
+
+
+def load_latest_date(sheet_id: int) -> str | None:
+    """Return the latest date of the runs to the sheet, or None."""
+    with closing(connect()) as conn:
+        return conn.execute("SELECT MAX(date) FROM coverage WHERE sheet_id = ?", (sheet_id,)).fetchone()[0]
+
+
+def load_previous_values(sheet_id: int, date: str, cell_cols: dict[str, str]) -> dict[str, dict]:
+    """Return each vendor's values from its latest run to the sheet before date, as {VENDOR: {OUTPUT_COL_NAME: val}}.
+
+    cell_cols: {'OUTPUT_COL_NAME': 'SS_COL_NAME'}, as for ss.SSheet.get_values_from_row
+    """
+    cols = ", ".join(f"c.{HISTORY_COLS[i]}" for i in cell_cols.values())
+    query = f"""
+        SELECT c.vendor, {cols} FROM coverage c
+        JOIN (
+            SELECT vendor, MAX(date) AS date FROM coverage WHERE sheet_id = ? AND date < ? GROUP BY vendor
+        ) latest
+        ON c.vendor = latest.vendor AND c.date = latest.date
+        WHERE c.sheet_id = ?
+    """
+    with closing(connect()) as conn:
+        rows = conn.execute(query, (sheet_id, date, sheet_id)).fetchall()
+    return {vendor: dict(zip(cell_cols, vals)) for vendor, *vals in rows}
@@ -0,0 +1,215 @@
+"""Per-run stage timings and Smartsheet request counters, written under logs/ for the UI and for later review.
+
+- run(): one per Main.run_* call, nested calls join the outer run. On exit a JSON summary is written to LOG_DIR
+- stage(): times one step of a pipeline, optionally with the number of rows it handled
+- record_request(): called by ss.GovernedAdapter for every Smartsheet request, including retried 429s
+- profile(): dumps a cProfile of the block to LOG_DIR when the PROFILE_ENV environment variable is set
+
+Live progress is also written to PROGRESS_FILE, for runs in another process. See progress_text.
+"""
+
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Final, Iterator
+
+LOG_DIR: Final[str] = "logs"
+PROGRESS_FILE: Final[str] = "logs/progress.json"
+PROFILE_ENV: Final[str] = "DIAMONDS_PROFILE"
+PROGRESS_INTERVAL: Final[float] = 0.5  # seconds between progress writes triggered by requests
+
+
+@dataclass
+class Stage:
+    name: str
+    start: float
+    duration: float = None
+    rows: int = None
+
+    @property
+    def rows_per_sec(self) -> float | None:
+        return self.rows / self.duration if self.rows and self.duration else None
+
+
+class Run:
+    """Timings and counters for one run. Updated from several threads, e.g. by run_both's two pipelines."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.started = datetime.now()
+        self.start = time.perf_counter()
+        self.stages: list[Stage] = []
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.request_time = 0.0
+        self.notes: dict = {}
+        self.error: str = None
+        self._last_write = 0.0
+        self._lock = threading.Lock()
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "run": self.name,
+                "started": self.started.isoformat(timespec="seconds"),
+                "elapsed": round(time.perf_counter() - self.start, 3),
+                "active": [i.name for i in self.stages if i.duration is None],
+                "stages": [
+                    {**asdict(i), "start": round(i.start - self.start, 3), "rows_per_sec": i.rows_per_sec}
+                    for i in self.stages
+                ],
+                "requests": self.requests,
+                "retries": self.retries,
+                "errors": self.errors,
+                "bytes_sent": self.bytes_sent,
+                "bytes_received": self.bytes_received,
+                "request_time": round(self.request_time, 3),
+                **self.notes,
+                "error": self.error,
+            }
+
+    def write_progress(self, force: bool = True) -> None:
+        now = time.perf_counter()
+        if not force and now - self._last_write < PROGRESS_INTERVAL:
+            return
+        self._last_write = now
+        write_json(PROGRESS_FILE, self.summary())
+
+
+current: Run = None
+_current_lock = threading.Lock()
+_write_lock = threading.Lock()
+_profile_lock = threading.Lock()
+
+
+def write_json(path: str, data: dict) -> None:
+    """Write via a temp file, so readers never see a partial file."""
+    with _write_lock:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(data, f, indent=2, default=str)
+        os.replace(f"{path}.tmp", path)
+
+
+@contextmanager
+def run(name: str) -> Iterator[Run]:
+    """Start a run, or join the current one. The outermost run writes the summary when it exits, even on errors."""
+    global current
+    with _current_lock:
+        outer, current = current is None, current or Run(name)
+    this_run = current
+    if not outer:
+        yield this_run
+        return
+
+    this_run.write_progress()
+    try:
+        yield this_run
+    except Exception as err:
+        this_run.error = repr(err)
+        raise
+    finally:
+        summary = this_run.summary()
+        write_json(f"{LOG_DIR}/run_{this_run.started:%Y-%m-%d_%H%M%S}_{name}.json", summary)
+        write_json(PROGRESS_FILE, {**summary, "finished": True})
+        with _current_lock:
+            current = None
+
+
+@contextmanager
+def stage(name: str, rows: int = None) -> Iterator[Stage]:
+    """Time a stage of the current run. Without a current run this only yields."""
+    this_run = current
+    this_stage = Stage(name, time.perf_counter(), rows=rows)
+    if this_run is None:
+        yield this_stage
+        return
+
+    with this_run._lock:
+        this_run.stages.append(this_stage)
+    this_run.write_progress()
+    try:
+        yield this_stage
+    finally:
+        this_stage.duration = round(time.perf_counter() - this_stage.start, 3)
+        this_run.write_progress()
+
+
+def note(**values) -> None:
+    """Add values to the current run's summary, e.g. request counts per sheet."""
+    if current is not None:
+        with current._lock:
+            current.notes.update(values)
+
+
+def record_request(bytes_sent: int, bytes_received: int, latency: float, status: int) -> None:
+    this_run = current
+    if this_run is None:
+        return
+    with this_run._lock:
+        this_run.requests += 1
+        this_run.retries += status == 429
+        this_run.errors += status >= 400 and status != 429
+        this_run.bytes_sent += bytes_sent
+        this_run.bytes_received += bytes_received
+        this_run.request_time += latency
+    this_run.write_progress(force=False)
+
+
+@contextmanager
+def profile(name: str) -> Iterator[None]:
+    """cProfile the block into LOG_DIR/profile_NAME_TIME.pstats if PROFILE_ENV is set, e.g. DIAMONDS_PROFILE=1.
+
+    Only one profile runs at a time: nested or concurrent calls, e.g. run_both's pipelines inside its own profile, run
+    unprofiled. From Python 3.12 cProfile sees every thread, and a second profiler in the process fails to start.
+    Before 3.12 only the thread that started the profile is profiled.
+    """
+    if not os.environ.get(PROFILE_ENV) or not _profile_lock.acquire(blocking=False):
+        yield
+        return
+
+    try:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # another profiling tool is active, e.g. a debugger
+            profiler = None
+        try:
+            yield
+        finally:
+            if profiler:
+                profiler.disable()
+                os.makedirs(LOG_DIR, exist_ok=True)
+                profiler.dump_stats(f"{LOG_DIR}/profile_{name}_{datetime.now():%Y-%m-%d_%H%M%S}.pstats")
+    finally:
+        _profile_lock.release()
+
+
+def progress_text() -> str:
+    """One line describing the latest progress, for the UI's waiting dialog.
+
+    Read from the current run if it is in this process, otherwise from PROGRESS_FILE, e.g. once the run has finished.
+    """
+    this_run = current
+    if this_run is not None:
+        progress = this_run.summary()
+    else:
+        try:
+            with open(PROGRESS_FILE) as f:
+                progress = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return ""
+    stages = ", ".join(progress["active"]) or ("finished" if progress.get("finished") else "starting")
+    return (
+        f"{stages} ({progress['elapsed']:.0f}s), {progress['requests']} requests, "
+        f"{(progress['bytes_sent'] + progress['bytes_received']) / 1024**2:.1f} MB"
+        + (f", {progress['retries']} rate limited" if progress["retries"] else "")
+    )
@@ -1,11 +1,22 @@
-import time
+import logging
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING
 
-import pandas as pd
-
-from src import data, ss, utils
+from src import instrument, utils
 from src.constants import *
 
-pd.options.mode.chained_assignment = None  # default='warn'
+# data (pandas, validators) and ss (smartsheet) are imported where used, so the UI can start before they are loaded
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from src import ss
+
+logger = logging.getLogger(__name__)
+
+
+def import_data() -> None:
+    """Import src.data, e.g. in a cpu_pool worker ahead of its first task. Returns None, as modules can't be pickled."""
+    from src import data  # noqa: F401
 
 
 class Main:
@@ -13,21 +24,39 @@ class Main:
 
     Also used for data persistence scross UI functions, esp. for binding purposes (i.e. dataclass)
     Wraps the data and ss modules for use by the UI.
+
+    input_df is read-only: the pipelines share it, so nothing may add columns to it or modify it in place.
     """
 
     def __init__(self):
-        self.ssheet_cov: ss.SSheet = None
-        self.ssheet_audit: ss.SSheet = None
+        self.ssheet_cov: "ss.SSheet" = None
+        self.ssheet_audit: "ss.SSheet" = None
         self.coverages_sheet_name: str = None
         self.audit_sheet_name: str = None
+        self.ss_client: "smartsheet.Smartsheet" = None  # optional client shared by both sheets, e.g. a fake backend
 
-        self.coverage_df: pd.DataFrame = None
-        self.audit_df: pd.DataFrame = None
-        self.input_df: pd.DataFrame = None
+        self.coverage_df: "pd.DataFrame" = None
+        self.audit_df: "pd.DataFrame" = None
+        self.input_df: "pd.DataFrame" = None
         self.date: str = None
         self.audit_num: int = None
         self.selected_vendors: dict[str, bool] = {}
 
+        # batch_uploads: add all new vendors in one request and each vendor's rows in one request
+        self.batch_uploads: bool = True
+        # delta_uploads: only upload vendors whose data.DELTA_COLS metrics changed since the previous run
+        self.delta_uploads: bool = False
+        # upload_workers: number of vendors whose child rows are uploaded concurrently, defaults to ss.UPLOAD_WORKERS.
+        # All go to one sheet, where overlapping writes are rejected (errorCode 4004) and retried by the SDK
+        self.upload_workers: int = None
+        # cpu_pool: e.g. a ProcessPoolExecutor for classify_url_video, the CPU-bound stage. None runs it in this thread
+        self.cpu_pool: Executor = None
+        self.coverage_requests: int = 0
+        self.unchanged_vendors: list[str] = []
+        self.upload_errors: dict[str, Exception] = {}
+        self.pipeline_errors: dict[str, Exception] = {}
+        self.peak_memory_mb: float = None
+
     def csv_vendors(self):
         """Populate selected_vendors, used for vendor bindings."""
         if self.input_df is not None:
@@ -46,35 +75,159 @@ class Main:
         return [k for k, v in self.selected_vendors.items() if v]
 
     def run_both(self):
-        self.run_coverages()
-        self.run_audits()
-
-    def run_coverages(self):
-        """Run methods to add to Diamond Coverages sheet."""
-        self.get_coverages_ss()
-        self.coverage_df = data.create_output_df(self.input_df, self.date)
-        self.ssheet_cov.get_parents_and_first_child_data({"Prev Video": SS_VIDEO_TRUE, "Prev Inven": SS_PERC_INV})
-        new_vendors = self.load_new_vendors()
+        """Run the coverages and audits pipelines at the same time, they only share the read-only input_df.
+
+        - Both sheet fetches start straight away, while the URL/video masks are computed once for both pipelines
+        - Profiled as one, see instrument.profile
+        - A failure in one pipeline does not cancel the other. Errors are kept per pipeline in pipeline_errors and
+          raised together once both have finished
+        """
+        self.pipeline_errors = {}
+        with instrument.run("both"), instrument.profile("both"), ThreadPoolExecutor(max_workers=3) as pool:
+            masks = pool.submit(self.classify_url_video)
+            futures = {
+                pool.submit(self.run_coverages, masks): "Coverages",
+                pool.submit(self.run_audits, masks): "Audits",
+            }
+            for future in as_completed(futures):
+                if future.exception():
+                    self.pipeline_errors[futures[future]] = future.exception()
+
+            if self.pipeline_errors:
+                for pipeline, err in self.pipeline_errors.items():
+                    logger.error("%s failed: %s", pipeline, err)
+                raise RuntimeError(
+                    "; ".join(f"{pipeline} failed: {err}" for pipeline, err in self.pipeline_errors.items())
+                ) from next(iter(self.pipeline_errors.values()))
+
+    def run_coverages(self, masks: "Future[pd.DataFrame]" = None):
+        """Run methods to add to Diamond Coverages sheet. Once uploaded, the run is saved to the history store.
+
+        masks: data.classify_url_video of input_df, being computed elsewhere, see run_both
+        Each step is timed as an instrument stage, see instrument for the summary and progress files.
+        """
+        from src import data
+
+        with instrument.run("coverages"), instrument.profile("coverages"):
+            with instrument.stage("Coverages: fetch sheet"):
+                self.get_coverages_ss()
+            url_masks = masks.result() if masks else self.classify_url_video()
+            with instrument.stage("Coverages: aggregate", rows=len(self.input_df)):
+                output_df = data.create_output_df(self.input_df, self.date, url_masks)
+            self.upload_coverages(output_df)
+
+            self.coverage_requests = self.ssheet_cov.request_count
+            logger.info("Coverages upload used %s Smartsheet requests", self.coverage_requests)
+            instrument.note(coverage_requests=self.coverage_requests, unchanged_vendors=len(self.unchanged_vendors))
+            self.log_peak_memory("Coverages")
+
+    def upload_coverages(self, output_df: "pd.DataFrame") -> None:
+        """Upload create_output_df's output for self.date to the loaded Coverages sheet, see get_coverages_ss.
+
+        Afterwards the run is saved to the history store and its values become the sheet's previous_values, so
+        several dates can be uploaded in a row, oldest first.
+        """
+        from src import data, history
+
+        self.coverage_df = output_df
+        if self.delta_uploads:
+            self.coverage_df, self.unchanged_vendors = data.split_unchanged(
+                self.coverage_df, self.ssheet_cov.previous_values
+            )
+            logger.info(
+                "Skipped %s unchanged vendors, uploading %s: %s",
+                len(self.unchanged_vendors),
+                len(self.coverage_df),
+                ", ".join(self.unchanged_vendors),
+            )
+        with instrument.stage("Coverages: add new vendors"):
+            self.load_new_vendors()
         self.coverage_df = data.add_comparison_columns(self.coverage_df, self.ssheet_cov.previous_values)
 
-        if len(new_vendors) > 5:  # seems to help with API when uploading many vendors
-            time.sleep(10)
-        self.iterate_and_load_rows()
+        with instrument.stage("Coverages: upload", rows=len(self.coverage_df)):
+            self.iterate_and_load_rows()
+        history.save_run(output_df, self.date, self.ssheet_cov.sheet.id, self.ssheet_cov.sheet.version)
+        self.ssheet_cov.previous_values.update(data.to_previous_values(output_df))
 
-    def run_audits(self):
-        """Run methods to add to Vendor Audit sheet."""
-        self.get_audit_ss()
-        self.audit_df = data.parse_vendor_audit(self.input_df, self.create_vendors_list(), self.date, self.audit_num)
-        utils.save_df_output(self.audit_df)
-        self.ssheet_audit.upload_dataframe(self.audit_df)
+    def run_audits(self, masks: "Future[pd.DataFrame]" = None):
+        """Run methods to add to Vendor Audit sheet.
+
+        masks: as for run_coverages, only the Has Video mask is used
+        """
+        from src import data
+
+        with instrument.run("audits"), instrument.profile("audits"):
+            with instrument.stage("Audits: fetch sheet"):
+                self.get_audit_ss()
+            has_video = (masks.result() if masks else self.classify_url_video())[SS_VIDEO_TRUE]
+            with instrument.stage("Audits: select rows", rows=len(self.input_df)):
+                self.audit_df = data.parse_vendor_audit(
+                    self.input_df, self.create_vendors_list(), self.date, self.audit_num, has_video
+                )
+            output = utils.save_df_output(self.audit_df, self.date)  # written while the rows upload
+            with instrument.stage("Audits: upload", rows=len(self.audit_df)):
+                self.ssheet_audit.upload_dataframe(self.audit_df)
+            logger.info("Audit rows saved to %s", output.result())
+            instrument.note(audit_requests=self.ssheet_audit.request_count)
+            self.log_peak_memory("Audits")
+
+    def classify_url_video(self) -> "pd.DataFrame":
+        """Return data.classify_url_video of input_df, computed in cpu_pool if set.
+
+        Only the two columns it reads are sent to the pool, never Main or the rest of input_df, and only the masks
+        come back. The rest of the run stays in this process, so its state and progress are kept.
+        """
+        from src import data
+
+        with instrument.stage("Classify URLs and videos", rows=len(self.input_df)):
+            if self.cpu_pool is None:
+                return data.classify_url_video(self.input_df)
+            return self.cpu_pool.submit(data.classify_url_video, self.input_df[[CSV_URL, CSV_VIDEO]]).result()
+
+    def log_peak_memory(self, pipeline: str) -> None:
+        """Record and log the process' peak memory. It covers every run so far in this process, not just this one."""
+        self.peak_memory_mb = utils.peak_memory_mb()
+        logger.info("%s finished, peak memory %.0f MB", pipeline, self.peak_memory_mb)
+        instrument.note(peak_memory_mb=round(self.peak_memory_mb))
 
     def get_coverages_ss(self):
-        self.ssheet_cov = ss.SSheet()
-        self.ssheet_cov.get_sheet(self.coverages_sheet_name)
+        """Load the Coverages sheet's parent rows and the previous run's values, without the full sheet history.
+
+        Previous values come from the local history store while the sheet is still at the version recorded after our
+        last upload. Otherwise, e.g. on the first run or after someone else changed the sheet, and for vendors missing
+        from the store, they are read from the first child rows on the sheet.
+        """
+        from src import data, history, ss
+
+        cell_cols = data.PREVIOUS_COLS
+        self.ssheet_cov = ss.SSheet(client=self.ss_client)
+        self.ssheet_cov.get_parent_history(self.coverages_sheet_name)
+
+        missing = self.ssheet_cov.parent_rows.keys()
+        sheet = self.ssheet_cov.sheet
+        if history.load_sheet_version(sheet.id) == sheet.version:
+            self.ssheet_cov.previous_values = history.load_previous_values(sheet.id, self.date, cell_cols)
+            missing = missing - self.ssheet_cov.previous_values.keys()
+        self.ssheet_cov.get_first_child_values(cell_cols, missing)
+
+    def get_latest_coverage_date(self) -> str | None:
+        """Return the latest date uploaded to the Coverages sheet loaded by get_coverages_ss, or None.
+
+        Read from the local history store while the sheet is still at the recorded version, otherwise from the first
+        child rows on the sheet.
+        """
+        from src import history
+
+        sheet = self.ssheet_cov.sheet
+        if history.load_sheet_version(sheet.id) == sheet.version:
+            return history.load_latest_date(sheet.id)
+        return self.ssheet_cov.get_latest_child_value(SS_DATE)
 
     def get_audit_ss(self):
-        self.ssheet_audit = ss.SSheet()
-        self.ssheet_audit.get_sheet(self.audit_sheet_name)
+        from src import ss
+
+        self.ssheet_audit = ss.SSheet(client=self.ss_client)
+        self.ssheet_audit.get_sheet(self.audit_sheet_name, page_size=1)  # only the columns are needed
 
     def load_new_vendors(self) -> list[str | None]:
         """Push new vendors to the sheet.
@@ -84,24 +237,50 @@ class Main:
         ss_vendors = list(self.ssheet_cov.parent_rows.keys())
         new_vendors = utils.filter_list(self.coverage_df[SS_VENDOR], ss_vendors)
         if new_vendors:
-            for vendor_val in new_vendors:
-                self.ssheet_cov.add_row_single_col_single_val(SS_VENDOR, vendor_val, update_parents=True)
+            if self.batch_uploads:
+                self.ssheet_cov.add_parent_rows(SS_VENDOR, new_vendors)
+            else:
+                for vendor_val in new_vendors:
+                    self.ssheet_cov.add_row_single_col_single_val(SS_VENDOR, vendor_val, update_parents=True)
             return new_vendors
         return []
 
     def iterate_and_load_rows(self) -> None:
-        """Iterates over DataFrame and uploads by row by row. API does not allow rows with differing parentIds to be
-        added in same request.
+        """Iterates over DataFrame and uploads the rows grouped by parent. API does not allow rows with differing
+        parentIds to be added in same request.
 
         - New rows are simply added as the first child row under that parent.
-        - Creates row_vals for the row, which are a list of cells. Each cell element will have the column_name and
-          value fields
-        - This is sent to the smartsheet method along with the parent name, i.e. the Vendor (df_row[0])
+        - Row payloads are built column-wise by SSheet.row_payloads and grouped by the first column, i.e. the Vendor
+        - With batch_uploads, all rows for a parent go out in one request, otherwise one request per row
+        - Vendors are uploaded by a pool of upload_workers threads. A vendor's rows stay in one worker, in order, so the
+          newest row still ends up on top
+        - Errors are collected per vendor in upload_errors, and raised together once every vendor has been tried
         """
-        df_cols = list(self.coverage_df.columns)
-        for _, df_row in self.coverage_df.iterrows():
-            row_vals = []
-            for i, col in enumerate(df_cols):
-                row_vals.append({"col_name": col, "value": df_row[i]})
+        rows_by_vendor: dict[str, list[dict]] = {}
+        vendors = self.coverage_df.iloc[:, 0].tolist()
+        for vendor, row in zip(vendors, self.ssheet_cov.row_payloads(self.coverage_df)):
+            rows_by_vendor.setdefault(vendor, []).append(row)
+
+        def load_vendor_rows(vendor: str, vendor_rows: list[dict]) -> None:
+            if self.batch_uploads:
+                self.ssheet_cov.add_child_row_group(vendor_rows, vendor)
+            else:
+                for row in vendor_rows:
+                    self.ssheet_cov.add_child_row_group([row], vendor)
+
+        from src import ss
+
+        self.upload_errors = {}
+        with ThreadPoolExecutor(max_workers=self.upload_workers or ss.UPLOAD_WORKERS) as pool:
+            futures = {pool.submit(load_vendor_rows, k, v): k for k, v in rows_by_vendor.items()}
+            for future in as_completed(futures):
+                if future.exception():
+                    self.upload_errors[futures[future]] = future.exception()
 
-            self.ssheet_cov.add_child_rows(row_vals, df_row[0])
+        if self.upload_errors:
+            for vendor, err in self.upload_errors.items():
+                logger.error("Upload failed for vendor %s: %s", vendor, err)
+            raise RuntimeError(
+                f"Upload failed for {len(self.upload_errors)} of {len(rows_by_vendor)} vendors: "
+                f"{', '.join(self.upload_errors)}"
+            ) from next(iter(self.upload_errors.values()))
@@ -1,7 +1,53 @@
+import json
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Final, Iterable, Iterator
+
+import requests
 import smartsheet
+from requests.adapters import BaseAdapter
+from smartsheet.util import serialize
 
+from src import instrument, utils
 from src.constants import SS_API_KEY
 
+# Bulk upload limits, see SSheet.upload_rows. Requests over ~200000 rows have failed before
+UPLOAD_MAX_ROWS: Final[int] = 20000
+UPLOAD_MAX_BYTES: Final[int] = 8 * 1024 * 1024
+# Smartsheet serializes writes to a sheet per access token and answers overlapping ones with errorCode 4004, so a
+# sheet's uploads are sent one at a time by default
+UPLOAD_WORKERS: Final[int] = 1
+UPLOAD_RETRIES: Final[int] = 3
+
+# Row paging for SSheet.get_parent_history. Row ids are batched to keep the request URL short
+PAGE_SIZE: Final[int] = 5000
+ROW_ID_BATCH: Final[int] = 100
+
+# Smartsheet allows 300 requests per minute per access token. See RateGovernor
+RATE_LIMIT_PER_MIN: Final[int] = 300
+RATE_MIN_PER_MIN: Final[int] = 30
+RATE_RETRIES: Final[int] = 5
+
+# Keep-alive connections held by each pooled client, see get_client
+POOL_CONNECTIONS: Final[int] = 8
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ChunkResult:
+    """Outcome of one bulk upload request."""
+
+    index: int
+    rows: int
+    bytes: int
+    attempts: int
+    latency: float
+    error: Exception | None = None
+
 
 def get_dict_value(cols_dict: dict, col_name: str) -> int:
     """Return the columnId field based on the column name lookup."""
@@ -11,48 +57,280 @@ def get_dict_value(cols_dict: dict, col_name: str) -> int:
     return col_id
 
 
+def chunk_rows(
+    rows: Iterable, max_rows: int = UPLOAD_MAX_ROWS, max_bytes: int = UPLOAD_MAX_BYTES
+) -> Iterator[tuple[list, int]]:
+    """Yield (chunk, encoded size) from rows, each chunk holding at most max_rows rows and max_bytes of JSON.
+
+    rows are Row models or request-ready dicts, see SSheet.row_payloads.
+    A single row larger than max_bytes is still sent, on its own.
+    """
+    chunk, chunk_size = [], 0
+    for row in rows:
+        payload = row if isinstance(row, dict) else serialize(row)
+        row_size = len(json.dumps(payload).encode()) + 1  # +1 for the list separator
+        if chunk and (len(chunk) >= max_rows or chunk_size + row_size > max_bytes):
+            yield chunk, chunk_size
+            chunk, chunk_size = [], 0
+        chunk.append(row)
+        chunk_size += row_size
+    if chunk:
+        yield chunk, chunk_size
+
+
+def is_transient(err: Exception) -> bool:
+    """Whether a failed request can safely be sent again. add_rows is not idempotent, so only errors where the rows
+    were surely not added are transient:
+
+    - connection errors, including connect timeouts. Read timeouts are not, the server may have added the rows
+    - API errors the SDK marks should_retry (rate limits, maintenance, server timeouts), and other 5xx responses
+    """
+    wrapped = isinstance(err, (smartsheet.exceptions.UnexpectedRequestError, smartsheet.exceptions.HttpError))
+    cause = err.__cause__ if wrapped else err
+    if isinstance(cause, requests.exceptions.ConnectionError):
+        return True
+    if isinstance(err, smartsheet.exceptions.ApiError):
+        return err.should_retry or (err.error.result.status_code or 0) >= 500
+    return False
+
+
+def log_chunk_result(result: ChunkResult) -> None:
+    if result.error:
+        logger.error(
+            "Chunk %s (%s rows) failed after %s attempts: %s", result.index, result.rows, result.attempts, result.error
+        )
+    else:
+        logger.info(
+            "Chunk %s uploaded: %s rows, %s bytes, %s attempts, %.2fs",
+            result.index,
+            result.rows,
+            result.bytes,
+            result.attempts,
+            result.latency,
+        )
+
+
+class RateGovernor:
+    """Token bucket shared by every SSheet, so all API calls from this process stay under the per-minute limit.
+
+    - Calls take a token, waiting for one if the bucket is empty. The bucket holds up to a minute's worth of tokens
+    - On a 429 the rate is halved and all callers wait out the Retry-After header
+    - Each successful call raises the rate back towards max_per_min
+    """
+
+    def __init__(self, max_per_min: int = RATE_LIMIT_PER_MIN, min_per_min: int = RATE_MIN_PER_MIN) -> None:
+        self.max_per_min = max_per_min
+        self.min_per_min = min_per_min
+        self.rate = max_per_min
+        self.tokens = float(max_per_min)
+        self.throttled_count = 0
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a call is allowed."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self._updated) * self.rate / 60)
+                self._updated = now
+                if now >= self._paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self._paused_until - now, (1 - self.tokens) * 60 / self.rate)
+            time.sleep(wait)
+
+    def success(self) -> None:
+        with self._lock:
+            self.rate = min(self.max_per_min, self.rate + 1)
+
+    def throttled(self, retry_after: float) -> None:
+        """Back off after a 429, retry_after being the server's Retry-After in seconds."""
+        with self._lock:
+            self.throttled_count += 1
+            self.rate = max(self.min_per_min, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        logger.warning("Smartsheet rate limit hit, pausing %.0fs at %.0f requests/min", retry_after, self.rate)
+
+
+GOVERNOR = RateGovernor()
+
+
+class GovernedAdapter(BaseAdapter):
+    """Transport adapter that sends every request through a RateGovernor, retrying 429s after their Retry-After.
+
+    Every attempt is recorded with instrument.record_request. Wraps the adapter already mounted on the SDK session, so
+    it also works with fake_ss.FakeSmartsheet.
+    """
+
+    def __init__(self, adapter: BaseAdapter, governor: RateGovernor = GOVERNOR, retries: int = RATE_RETRIES) -> None:
+        super().__init__()
+        self.adapter = adapter
+        self.governor = governor
+        self.retries = retries
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        body = request.body or b""
+        for _ in range(self.retries):
+            self.governor.acquire()
+            start = time.perf_counter()
+            response = self.adapter.send(request, **kwargs)
+            instrument.record_request(
+                len(body), len(response.content), time.perf_counter() - start, response.status_code
+            )
+            if response.status_code != 429:
+                self.governor.success()
+                return response
+            self.governor.throttled(float(response.headers.get("Retry-After") or 1))
+        return response  # still throttled, left to the SDK's own retries
+
+    def close(self) -> None:
+        self.adapter.close()
+
+
+def govern_client(client: smartsheet.Smartsheet, governor: RateGovernor = GOVERNOR) -> None:
+    """Route all of the client's requests through governor. Clients already governed are left as they are."""
+    adapters = client._session.adapters
+    for prefix, adapter in adapters.items():
+        if not isinstance(adapter, GovernedAdapter):
+            adapters[prefix] = GovernedAdapter(adapter, governor)
+
+
+_clients: dict[str, smartsheet.Smartsheet] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key: str = None, max_connections: int = POOL_CONNECTIONS) -> smartsheet.Smartsheet:
+    """Return the process-wide client for api_key, creating it on first use.
+
+    The client's HTTP session keeps up to max_connections connections alive, so later runs in the same process reuse
+    them instead of opening new TLS connections. max_connections only applies when the client is created.
+    """
+    api_key = api_key or SS_API_KEY
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = _clients[api_key] = smartsheet.Smartsheet(api_key, max_connections=max_connections)
+            client.errors_as_exceptions(True)
+            govern_client(client)
+        return client
+
+
+def close_clients() -> None:
+    """Close the pooled clients' connections, e.g. on app shutdown. get_client creates new clients afterwards."""
+    with _clients_lock:
+        for client in _clients.values():
+            client._session.close()
+        _clients.clear()
+
+
+class SheetIndex:
+    """Columnar index of a sheet's rows, built once per sheet load so lookups don't scan the row models.
+
+    - row_ids, parent_ids: one entry per row, in sheet order
+    - positions: {ROW_ID: position}
+    - columns: {COLUMN_ID: [value per row position]}
+    - children: {PARENT_ROW_ID: [child ROW_IDs in sheet order]}
+    """
+
+    def __init__(self, rows: list[smartsheet.models.Row]) -> None:
+        self.row_ids = []
+        self.parent_ids = []
+        self.columns = {}
+        self.children = {}
+
+        for pos, row in enumerate(rows):
+            self.row_ids.append(row.id)
+            self.parent_ids.append(row.parent_id)
+            if row.parent_id:
+                self.children.setdefault(row.parent_id, []).append(row.id)
+            for cell in row.cells:
+                col = self.columns.get(cell.column_id)
+                if col is None:
+                    col = self.columns[cell.column_id] = [None] * len(rows)
+                col[pos] = cell.value
+
+        self.positions = {row_id: pos for pos, row_id in enumerate(self.row_ids)}
+
+    def value(self, row_id: int, col_id: int) -> object:
+        col = self.columns.get(col_id)
+        return col[self.positions[row_id]] if col else None
+
+
 class SSheet:
-    def __init__(self, api_key: str = None) -> None:
+    def __init__(self, api_key: str = None, client: smartsheet.Smartsheet = None) -> None:
+        """api_key: defaults to SS_API_KEY
+        client: use this SDK client instead of the pooled one from get_client, e.g. one from fake_ss.FakeSmartsheet
+        """
         self.parent_rows = {}
         self.previous_values = {}
         self.cols_dict = None
         self.sheet = None
-        self.sheet_rows = []
+        self.index: SheetIndex = None
+        self.first_children = {}  # {ROW_ID: PARENT_NAME}, see get_parent_history
+        self.request_count = 0
+        self._lock = threading.Lock()
 
-        if not api_key:
-            api_key = SS_API_KEY
-
-        self.ss_client = smartsheet.Smartsheet(api_key)
+        self.ss_client = client or get_client(api_key)
         self.ss_client.errors_as_exceptions(True)
+        govern_client(self.ss_client)
         self.base_row_vals = {"overrideValidation": True, "strict": False}
 
-    def get_sheet(self, sheet_id: str | int) -> None:
-        """Retrieve specified sheet, either by sheet name or sheet id."""
-
-        def get_sheet_id(sheet_name: str) -> int:
-            """Get the sheet id from the sheet name."""
-            sheet_dict = self.ss_client.Sheets.list_sheets(include_all=True).to_dict()
-            for sheet in sheet_dict["data"]:
-                if sheet["name"].upper() == sheet_name.upper():
-                    return sheet["id"]
-            raise NameError("Cannot find the specified Smartsheet")
+    def get_sheet(self, sheet_id: str | int, **params) -> None:
+        """Retrieve specified sheet, either by sheet name or sheet id.
 
+        params are passed on to the API, e.g. page_size=1 to only load the sheet's details and columns.
+        Sheet names are resolved through the on-disk id cache. If the cached id no longer exists or now belongs to a
+        differently named sheet, the name is resolved again and the sheet re-fetched.
+        """
+        sheet_name = None
         if isinstance(sheet_id, str):
-            sheet_id = get_sheet_id(sheet_id)
+            sheet_name, sheet_id = sheet_id, self.resolve_sheet_id(sheet_id)
         elif not isinstance(sheet_id, int):
             raise TypeError("Value must either be the Sheet Name or Sheet ID.")
 
-        self.sheet = self.ss_client.Sheets.get_sheet(sheet_id)
-        self.sheet_rows = self.sheet.rows.to_list()
+        try:
+            self.request_count += 1
+            self.sheet = self.ss_client.Sheets.get_sheet(sheet_id, **params)
+        except smartsheet.exceptions.ApiError:
+            if not sheet_name:
+                raise
+            self.sheet = None
+
+        if sheet_name and (self.sheet is None or self.sheet.name.upper() != sheet_name.upper()):
+            sheet_id = self.resolve_sheet_id(sheet_name, refresh=True)
+            self.request_count += 1
+            self.sheet = self.ss_client.Sheets.get_sheet(sheet_id, **params)
+
+        self.index = SheetIndex(self.sheet.rows)
         self.get_dict_of_sheet_col_names()
 
+    def resolve_sheet_id(self, sheet_name: str, refresh: bool = False) -> int:
+        """Get the sheet id from the sheet name, using the cache in utils.SHEET_ID_FILE unless refresh is set.
+
+        Without a cache hit, every sheet in the account is listed and scanned, which is slow for large accounts.
+        """
+        sheet_id = None if refresh else utils.load_sheet_id(sheet_name)
+        if sheet_id:
+            return sheet_id
+
+        self.request_count += 1
+        sheet_dict = self.ss_client.Sheets.list_sheets(include_all=True).to_dict()
+        for sheet in sheet_dict["data"]:
+            if sheet["name"].upper() == sheet_name.upper():
+                utils.save_sheet_id(sheet_name, sheet["id"])
+                return sheet["id"]
+        raise NameError("Cannot find the specified Smartsheet")
+
     def get_dict_of_sheet_col_names(self) -> None:
         """Return dict of {col_title: col_id} for use in row generation.
 
-        This is used to easily retrieve the columnId field by lookups on the column name.
+        This is used to easily retrieve the columnId field by lookups on the column name. The sheet response already
+        holds every column, so no extra request is needed.
         """
-        col_dict = self.sheet.get_columns(include_all=True).to_dict()
-        self.cols_dict = {i["title"]: i["id"] for i in col_dict["data"]}
+        self.cols_dict = {col.title: col.id for col in self.sheet.columns}
 
     def get_parents_and_first_child_data(self, cell_cols: dict[str] = None) -> None:
         """Find all parent rows and update parent_rows attr. Optionally update previous_values attr.
@@ -66,41 +344,105 @@ class SSheet:
         This is used to easily retrieve the columnId field by lookups on the column names. The child values is used for
         adding additional rows to later uploads.
         """
-
-        for i, row in enumerate(self.sheet.rows.to_list()):
-            row = row.to_dict()
-
-            # create parents dict
-            if not row.get("parentId"):
-                parent_name = row["cells"][0].get("value")
-                if parent_name:  # helps handle empty rows
-                    self.parent_rows.update({parent_name: row["id"]})
-                    parent_index = i
-
-            else:
-                if cell_cols and i == parent_index + 1:  # most recent should be directly below parent, ie desc. order
-                    self.get_values_from_row(row, cell_cols, parent_name)
-
-    def get_values_from_row(self, row: smartsheet.models.Row, cell_cols: dict[str], parent_name: str) -> None:
+        parent_names = self.index.columns.get(self.sheet.columns[0].id, [])
+        for pos, row_id in enumerate(self.index.row_ids):
+            if self.index.parent_ids[pos] or not parent_names[pos]:  # helps handle empty rows
+                continue
+            self.parent_rows.update({parent_names[pos]: row_id})
+
+            children = self.index.children.get(row_id)
+            if cell_cols and children:  # most recent should be directly below parent, ie desc. order
+                self.get_values_from_row(children[0], cell_cols, parent_names[pos])
+
+    def get_parent_history(self, sheet_id: str | int, cell_cols: dict[str] = None, page_size: int = PAGE_SIZE) -> None:
+        """Column-projected, paged version of get_sheet + get_parents_and_first_child_data.
+
+        Only loads what is needed to update parent_rows and previous_values, instead of every cell of every row:
+          - one single-row request resolves the sheet and its columns
+          - rows are paged through with only the primary column. Child rows repeat the Vendor in the primary column
+            (see Main.iterate_and_load_rows), so the listing still holds one small row per weekly upload and grows
+            with the sheet, only much slower than the full sheet. Only the first child under each parent is noted
+          - the first child rows are then fetched by id, with only the cell_cols columns
+
+        self.sheet only holds the first row afterwards, so get_col_values_by_col_name needs a full get_sheet.
+        Without cell_cols only the parents are loaded, get_first_child_values can still be called afterwards.
+        """
+        self.get_sheet(sheet_id, page_size=1)
+        primary_id = next(col.id for col in self.sheet.columns if col.primary)
+
+        self.first_children = {}
+        parent_name = None
+        page, pages = 1, 1
+        while page <= pages:
+            self.request_count += 1
+            sheet_page = self.ss_client.Sheets.get_sheet(
+                self.sheet.id, column_ids=[primary_id], exclude="nonexistentCells", page_size=page_size, page=page
+            )
+            pages = -(-sheet_page.total_row_count // page_size)
+            for row in sheet_page.rows:
+                if not row.parent_id:
+                    parent_name = row.cells[0].value if row.cells else None
+                    if parent_name:  # helps handle empty rows
+                        self.parent_rows.update({parent_name: row.id})
+                elif parent_name:  # most recent should be directly below parent, ie desc. order
+                    self.first_children.update({row.id: parent_name})
+                    parent_name = None
+            page += 1
+
+        if cell_cols:
+            self.get_first_child_values(cell_cols)
+
+    def get_first_child_values(self, cell_cols: dict[str], parents: Iterable[str] = None) -> None:
+        """Update previous_values from the first child rows noted by get_parent_history, fetched by row id.
+
+        parents: only fetch the first children of these parent names, defaults to all
+        """
+        parents = None if parents is None else set(parents)
+        row_ids = [k for k, v in self.first_children.items() if parents is None or v in parents]
+        if not row_ids:
+            return
+        col_ids = [get_dict_value(self.cols_dict, i) for i in cell_cols.values()]
+        for i in range(0, len(row_ids), ROW_ID_BATCH):
+            self.request_count += 1
+            rows = self.ss_client.Sheets.get_sheet(
+                self.sheet.id, row_ids=row_ids[i : i + ROW_ID_BATCH], column_ids=col_ids
+            ).rows
+            index = SheetIndex(rows)
+            for row_id in index.row_ids:
+                self.get_values_from_row(row_id, cell_cols, self.first_children[row_id], index)
+
+    def get_latest_child_value(self, col_name: str) -> str | None:
+        """Return the largest col_name value of the first child rows noted by get_parent_history, e.g. the latest Date."""
+        col_id = get_dict_value(self.cols_dict, col_name)
+        row_ids = list(self.first_children)
+        values = []
+        for i in range(0, len(row_ids), ROW_ID_BATCH):
+            self.request_count += 1
+            rows = self.ss_client.Sheets.get_sheet(
+                self.sheet.id, row_ids=row_ids[i : i + ROW_ID_BATCH], column_ids=[col_id]
+            ).rows
+            index = SheetIndex(rows)
+            values += [index.value(row_id, col_id) for row_id in index.row_ids]
+        return max(filter(None, values), default=None)
+
+    def get_values_from_row(
+        self, row_id: int, cell_cols: dict[str], parent_name: str, index: SheetIndex = None
+    ) -> None:
         """Get values from the row specified by cell_cols data.
 
         cell_cols: This is a dict in the form of {'OUTPUT_COL_NAME', 'SS_COL_NAME'}
           - the OUTPUT_COL_NAME is used for the return value
           - the SS_COL_NAME matches against the sheet, and will be used to find the columnId (i.e. must match a SS col)
+        index: index holding the row, defaults to self.index
         """
-
-        def find_cell_vals(row: smartsheet.models.Row, col_id: int) -> str:
-            for cell in row["cells"]:
-                if cell["columnId"] == col_id:
-                    return cell.get("value", "")
-
-        cells = {k: find_cell_vals(row, get_dict_value(self.cols_dict, v)) for k, v in cell_cols.items()}
+        index = index or self.index
+        cells = {k: index.value(row_id, get_dict_value(self.cols_dict, v)) for k, v in cell_cols.items()}
         self.previous_values.update({parent_name: cells})
 
     def get_col_values_by_col_name(self, col_name: str) -> list[str]:
         """Return list of values in column given column name."""
         col_id = get_dict_value(self.cols_dict, col_name)
-        return [cell.value for row in self.sheet.rows for cell in row.cells if cell.column_id == col_id]
+        return list(self.index.columns.get(col_id, []))
 
     def add_row_single_col_single_val(self, col_name: str, value: str, update_parents: bool) -> None:
         """Add a new row with one value.
@@ -111,54 +453,142 @@ class SSheet:
         """
         col_id = get_dict_value(self.cols_dict, col_name)
         row = self.ss_client.models.Row({"cells": [{"column_id": col_id, "value": value, **self.base_row_vals}]})
-        new_row = self.sheet.add_rows(row)
+        new_row = self.add_rows(row)
 
         if update_parents:
             self.parent_rows.update({value: new_row.to_dict()["result"][0]["id"]})
 
+    def add_parent_rows(self, col_name: str, values: list[str]) -> None:
+        """Add a new parent row for each value in a single request, and update self.parent_rows with the new rows.
+
+        col_name: column name for the values. This will use self.cols_dict attr to find the columnId
+        values: values to load, one new row each. Rows are returned by the API in the order sent
+        """
+        if not values:
+            return
+        col_id = get_dict_value(self.cols_dict, col_name)
+        rows = [
+            self.ss_client.models.Row({"cells": [{"column_id": col_id, "value": value, **self.base_row_vals}]})
+            for value in values
+        ]
+        new_rows = self.add_rows(rows).to_dict()["result"]
+        self.parent_rows.update({value: row["id"] for value, row in zip(values, new_rows)})
+
     def add_child_rows(self, row_data: list[dict], parent_row: str) -> None:
         """Add a child row to the sheet. API does not allow rows with differing parentIds to be
         added in same request.
 
-        - Updates the cell list using the row_data passed to method
+        - Updates the cell list using the row_data passed to method, a list of {"col_name": ..., "value": ...}
         - assumes toTop
         - Column names from DF and from SS must match (will throw exception if not)
         """
         cells = [
-            {
-                "column_id": get_dict_value(self.cols_dict, col["col_name"]),
-                "value": col["value"],
-                **self.base_row_vals,
-            }
+            {"columnId": get_dict_value(self.cols_dict, col["col_name"]), "value": col["value"], **self.base_row_vals}
             for col in row_data
         ]
-        new_row = self.ss_client.models.Row({"parentId": self.parent_rows[parent_row], "toTop": True, "cells": cells})
-        self.sheet.add_rows([new_row])
+        self.add_child_row_group([{"cells": cells}], parent_row)
 
-    def upload_dataframe(self, df: "pd.DataFrame") -> None:
+    def add_child_row_group(self, rows: list[dict], parent_row: str) -> None:
+        """Add several child rows under the same parent in a single request.
+
+        - rows are payloads without a location, see row_payloads
+        - rows keep their order, i.e. the first row ends up directly below the parent
+        """
+        parent_id = self.parent_rows[parent_row]
+        self.add_rows([{**row, "parentId": parent_id, "toTop": True} for row in rows])
+
+    def row_payloads(self, df: "pd.DataFrame", display_value: bool = False, **location) -> Iterator[dict]:
+        """Lazily yield one request-ready add_rows payload per DF row, e.g. row_payloads(df, toBottom=True).
+
+        - column ids are resolved once, and values are read a column at a time as native Python values, so no Series
+          or column lookup is made per row or cell. Row models are only made by add_rows, once the chunk is sent
+        - location: API location fields for every row, e.g. toTop, toBottom or parentId
+        - empty values (None) are left out, as they are when sent as a Row model
+        """
+        col_ids = [get_dict_value(self.cols_dict, col) for col in df.columns]
+        columns = [df[col].tolist() for col in df.columns]
+        base = self.base_row_vals
+        for values in zip(*columns):
+            cells = [{"columnId": i, "value": val, **base} for i, val in zip(col_ids, values) if val is not None]
+            if display_value:
+                for cell in cells:
+                    cell["displayValue"] = str(cell["value"])
+            yield {**location, "cells": cells}
+
+    def add_rows(self, rows: "smartsheet.models.Row | list[smartsheet.models.Row | dict]"):
+        """Send one add_rows request to the loaded sheet. All API row additions should go through here.
+
+        - payload dicts, e.g. from row_payloads, are turned into Row models here, as SDK 3 serializes dicts as {}
+        - self.sheet.version is kept at the latest version returned, see history. Its rows are not updated
+        """
+        if isinstance(rows, list):
+            rows = [self.ss_client.models.Row(row) if isinstance(row, dict) else row for row in rows]
+        with self._lock:
+            self.request_count += 1
+        response = self.sheet.add_rows(rows)
+
+        with self._lock:
+            self.sheet.version = max(self.sheet.version or 0, response.version or 0)
+        return response
+
+    def upload_dataframe(
+        self, df: "pd.DataFrame", max_workers: int = UPLOAD_WORKERS, progress: Callable = None
+    ) -> list[ChunkResult]:
         """Convert a DF to Smartsheet in bulk.
 
-        Does not work for parent/child rows.
-        """
-        new_rows = []
-        for row in df.iterrows():
-            cells = [
-                {
-                    "column_id": get_dict_value(self.cols_dict, col),
-                    "value": val,
-                    "displayValue": str(val),
-                    **self.base_row_vals,
-                }
-                for col, val in row[1].items()
-            ]
-            new_rows.append(self.ss_client.models.Row({"toBottom": True, "cells": cells}))
-
-        # issues with posting if over a certain size
-        chunk_len = 100000  # somewhat aribitrary, tested with length of ~200000 so this is conservative
-        if len(new_rows) > chunk_len:
-            chunks = new_rows // chunk_len + 1  # add one to account for remainder
-            new_list = [new_rows[i:i + chunks] for i in range(0, len(new_rows), chunks)]
-            for sub_list in new_list:
-                self.sheet.add_rows(sub_list)
-        else:
-            self.sheet.add_rows(new_rows)
+        Does not work for parent/child rows. Rows are streamed into chunks (see upload_rows), so chunks may land on
+        the sheet in a different order than the DF when max_workers > 1.
+        """
+
+        rows = self.row_payloads(df, display_value=True, toBottom=True)
+        return self.upload_rows(rows, max_workers, progress)
+
+    def upload_rows(
+        self, rows: Iterable, max_workers: int = UPLOAD_WORKERS, progress: Callable = None
+    ) -> list[ChunkResult]:
+        """Upload rows in chunks bounded by row count and payload size, using a small pool of workers.
+
+        - rows can be any iterable, chunks are built and sent as it is consumed. All rows must share a location
+        - at most 2 * max_workers chunks are held in memory at once
+        - each chunk is retried on its own, see upload_chunk
+        - progress is called with each ChunkResult, defaults to logging it
+        - raises RuntimeError once every chunk has been tried, if any chunk still failed
+        """
+        progress = progress or log_chunk_result
+        results = []
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            pending = set()
+            for index, (chunk, size) in enumerate(chunk_rows(rows)):
+                if len(pending) >= 2 * max_workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    results.extend(i.result() for i in done)
+                pending.add(pool.submit(self.upload_chunk, index, chunk, size, progress))
+            results.extend(i.result() for i in wait(pending).done)
+
+        results.sort(key=lambda i: i.index)
+        failed = [i for i in results if i.error]
+        if failed:
+            raise RuntimeError(
+                f"{len(failed)} of {len(results)} chunks failed to upload: {[i.index for i in failed]}"
+            ) from failed[0].error
+        return results
+
+    def upload_chunk(self, index: int, chunk: list, size: int, progress: Callable) -> ChunkResult:
+        """Send one chunk, retrying transient errors with exponential backoff, see is_transient. Other errors fail the
+        chunk straight away. Errors are returned on the ChunkResult, not raised."""
+        start = time.perf_counter()
+        for attempt in range(1, UPLOAD_RETRIES + 2):
+            try:
+                self.add_rows(chunk)
+                error = None
+                break
+            except Exception as err:  # noqa: BLE001, any failure is reported per chunk
+                error = err
+                if not is_transient(err):
+                    break
+                if attempt <= UPLOAD_RETRIES:
+                    time.sleep(2**attempt)
+
+        result = ChunkResult(index, len(chunk), size, attempt, time.perf_counter() - start, error)
+        progress(result)
+        return result
@@ -1,15 +1,26 @@
 import hashlib
+import os
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from typing import Final, Iterable
 
 import yaml
 from pytz import timezone
-from tabulate import tabulate
 
 SHEET_NAME_FILE: Final[str] = "src/sheet_name.yaml"
+SHEET_ID_FILE: Final[str] = "src/sheet_ids.yaml"  # cache of {SHEET NAME: sheet id}, see ss.SSheet.resolve_sheet_id
+HISTORY_FILE: Final[str] = "src/history.sqlite3"  # previous coverages runs, see history
+OUTPUT_DIR: Final[str] = "logs/audits"  # see save_df_output
+OUTPUT_KEEP: Final[int] = 20
+PREVIEW_MAX_ROWS: Final[int] = 500
 TIMEZONE: Final[str] = "US/Pacific"
 TODAY: Final[str] = datetime.now(timezone(TIMEZONE)).strftime("%Y-%m-%d")  # replit is in UTC
 
+_output_pool = ThreadPoolExecutor(max_workers=1)
+_sheet_id_lock = threading.Lock()
+
 
 def save_sheet_name(sheet_name: str, _type: str) -> None:
     with open(SHEET_NAME_FILE, "r") as f:
@@ -20,11 +31,89 @@ def save_sheet_name(sheet_name: str, _type: str) -> None:
         yaml.safe_dump(data, f)
 
 
-def save_df_output(df: "pd.DataFrame") -> None:
-    """Save DataFrame as an table for reference."""
-    df_format = tabulate(df, headers="keys", tablefmt="psql")
-    with open("logs/df_output.txt", "w") as f:
-        f.write(f"DATE: {TODAY}\n\n{df_format}")
+def load_sheet_id(sheet_name: str) -> int | None:
+    """Return the cached sheet id for the sheet name (case insensitive), or None."""
+    try:
+        with open(SHEET_ID_FILE, "r") as f:
+            data = yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        return None
+    return data.get(sheet_name.upper())
+
+
+def save_sheet_id(sheet_name: str, sheet_id: int) -> None:
+    """Add the sheet id to the cache. run_both resolves both sheets at once, so updates are locked and the file is
+    replaced in one step, never read half written."""
+    with _sheet_id_lock:
+        try:
+            with open(SHEET_ID_FILE, "r") as f:
+                data = yaml.safe_load(f) or {}
+        except FileNotFoundError:
+            data = {}
+
+        data.update({sheet_name.upper(): sheet_id})
+        with open(f"{SHEET_ID_FILE}.tmp", "w") as f:
+            yaml.safe_dump(data, f)
+        os.replace(f"{SHEET_ID_FILE}.tmp", SHEET_ID_FILE)
+
+
+def save_df_output(df: "pd.DataFrame", date: str = TODAY) -> Future:
+    """Save the DataFrame for reference in the background, returning the Future of the CSV path.
+
+    - one CSV per run in OUTPUT_DIR, named by date and time. Only the newest OUTPUT_KEEP are kept
+    - frames of at most PREVIEW_MAX_ROWS rows also get a readable table in logs/df_output.txt
+    df must not be modified until the Future is done.
+    """
+    return _output_pool.submit(_write_df_output, df, date)
+
+
+def _write_df_output(df: "pd.DataFrame", date: str) -> str:
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    path = os.path.join(OUTPUT_DIR, f"audit_{date}_{datetime.now():%H%M%S}.csv")
+    df.to_csv(path, index=False)
+
+    outputs = [os.path.join(OUTPUT_DIR, i) for i in os.listdir(OUTPUT_DIR) if i.startswith("audit_")]
+    for old in sorted(outputs, key=os.path.getmtime)[:-OUTPUT_KEEP]:
+        os.remove(old)
+
+    if len(df) <= PREVIEW_MAX_ROWS:
+        from tabulate import tabulate  # only needed here, kept off the startup path
+
+        with open(os.path.join(os.path.dirname(OUTPUT_DIR), "df_output.txt"), "w") as f:
+            f.write(f"DATE: {date}\n\n{tabulate(df, headers='keys', tablefmt='psql')}")
+    return path
+
+
+def peak_memory_mb() -> float:
+    """Peak resident memory of this process so far, in MB. Use it to size the machines running the pipelines."""
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                (name, ctypes.c_size_t)
+                for name in (
+                    "PeakWorkingSetSize",
+                    "WorkingSetSize",
+                    "QuotaPeakPagedPoolUsage",
+                    "QuotaPagedPoolUsage",
+                    "QuotaPeakNonPagedPoolUsage",
+                    "QuotaNonPagedPoolUsage",
+                    "PagefileUsage",
+                    "PeakPagefileUsage",
+                )
+            ]
+
+        counters = ProcessMemoryCounters(cb=ctypes.sizeof(ProcessMemoryCounters))
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb)
+        return counters.PeakWorkingSetSize / 1024**2
+
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KB on Linux
 
 
 def filter_list(_list: list, filter_list: Iterable) -> list:
@@ -1,7 +1,45 @@
 import pandas as pd
 import pytest
 
+from src import instrument, utils
+
+
+@pytest.fixture(autouse=True)
+def tmp_sheet_id_file(tmp_path, monkeypatch):
+    """Keep the sheet id cache, history store and run logs out of the repo."""
+    monkeypatch.setattr(utils, 'SHEET_ID_FILE', str(tmp_path / 'sheet_ids.yaml'))
+    monkeypatch.setattr(utils, 'HISTORY_FILE', str(tmp_path / 'history.sqlite3'))
+    monkeypatch.setattr(utils, 'OUTPUT_DIR', str(tmp_path / 'logs' / 'audits'))
+    monkeypatch.setattr(instrument, 'LOG_DIR', str(tmp_path / 'logs'))
+    monkeypatch.setattr(instrument, 'PROGRESS_FILE', str(tmp_path / 'logs' / 'progress.json'))
+
 
 @pytest.fixture
 def fixture_audit_df():
     return pd.read_csv('tests/fixture.csv')
+
+
+@pytest.fixture
+def fake_coverage_sheet():
+    """Fake backend with a coverage sheet holding two weeks of history for VENDOR only.
+
+    As on the real sheet, child rows repeat the vendor in the primary column.
+    """
+    from src.fake_ss import FakeSmartsheet
+
+    fake = FakeSmartsheet()
+    sheet_id = fake.add_sheet(
+        "Coverage",
+        ['Vendor', 'Valid V360', 'Blank/Invalid', 'Has Video', 'No Video', 'Total Inv', 'Type', 'Date',
+         '% inv. w/ video', '% Inv w/ URLs', 'Difference Since Last', 'Change in % inv. w/ video'],
+    )
+    [parent_id] = fake.seed_rows(sheet_id, [{'Vendor': 'VENDOR'}])
+    fake.seed_rows(
+        sheet_id,
+        [
+            {'Vendor': 'VENDOR', 'Has Video': 7, 'Total Inv': 10, '% inv. w/ video': 0.7, 'Date': '2024-08-05'},
+            {'Vendor': 'VENDOR', 'Has Video': 5, 'Total Inv': 10, '% inv. w/ video': 0.5, 'Date': '2024-07-29'},
+        ],
+        parent_id=parent_id,
+    )
+    return fake, sheet_id
@@ -0,0 +1,44 @@
+from src import cli
+from src.main import Main
+
+
+def test_backfill(fixture_audit_df, fake_coverage_sheet, tmp_path):
+    fake, sheet_id = fake_coverage_sheet
+    audit_id = fake.add_sheet('Audit', ['Vendor', 'Video Link', 'Stock Number', 'Cert Number', 'Date'])
+    inputs = tmp_path / 'INPUTS'
+    inputs.mkdir()
+    fixture_audit_df.to_csv(inputs / '2024-08-12.csv', index=False)
+    fixture_audit_df.assign(**{'Video Upload': 'Y'}).to_csv(inputs / '2024-08-19.csv', index=False)
+    fixture_audit_df.to_csv(inputs / '2024-07-01.csv', index=False)
+    (inputs / 'notes.csv').write_text('not a week')
+
+    main = Main()
+    main.ss_client = fake.client()
+    dates = cli.backfill(inputs, 'Coverage', 'Audit', audit_num=1, since='2024-08-01', workers=2, main=main)
+
+    assert dates == ['2024-08-12', '2024-08-19']
+    vendor_rows = [row for row in fake.sheet_values(sheet_id) if row.get('_parent') == 'VENDOR']
+    assert [row['Date'] for row in vendor_rows] == ['2024-08-19', '2024-08-12', '2024-08-05', '2024-07-29']
+    newest, previous = vendor_rows[:2]
+    assert newest['Difference Since Last'] == newest['Has Video'] - previous['Has Video']
+    assert previous['Difference Since Last'] == previous['Has Video'] - 7
+    audit_rows = fake.sheet_values(audit_id)
+    assert [row['Date'] for row in audit_rows] == ['2024-08-12', '2024-08-12', '2024-08-19', '2024-08-19']
+
+
+def test_backfill_skips_older_weeks(fixture_audit_df, fake_coverage_sheet, tmp_path, caplog):
+    fake, sheet_id = fake_coverage_sheet
+    inputs = tmp_path / 'INPUTS'
+    inputs.mkdir()
+    for date in ['2024-08-01', '2024-08-05', '2024-08-12']:
+        fixture_audit_df.to_csv(inputs / f'{date}.csv', index=False)
+
+    main = Main()
+    main.ss_client = fake.client()
+    assert cli.backfill(inputs, 'Coverage', workers=1, main=main) == ['2024-08-12']
+    assert 'Skipping 2024-08-01, 2024-08-05' in caplog.text
+
+    fixture_audit_df.to_csv(inputs / '2024-08-19.csv', index=False)  # latest date now comes from the history store
+    assert cli.backfill(inputs, 'Coverage', workers=1, main=main) == ['2024-08-19']
+    vendor_rows = [row for row in fake.sheet_values(sheet_id) if row.get('_parent') == 'VENDOR']
+    assert [row['Date'] for row in vendor_rows] == ['2024-08-19', '2024-08-12', '2024-08-05', '2024-07-29']
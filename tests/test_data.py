@@ -1,3 +1,5 @@
+import pandas as pd
+
 from src import data
 
 
@@ -6,3 +8,85 @@ def test_parse_vendor_audit(fixture_audit_df):
 
     assert list(df.columns) == ['Vendor', 'Video Link', 'Stock Number', 'Cert Number', 'Date']
     assert list(df['Stock Number']) == ['2000AF', '110A', '105A', '104A', '102A', '99A', '80A', '55C', '8F']
+
+
+def test_parse_vendor_audit_vendor_order(fixture_audit_df):
+    before = fixture_audit_df.copy()
+    df = data.parse_vendor_audit(fixture_audit_df, ['LAB VENDOR', 'VENDOR', 'MISSING'], '2024-08-12', 2)
+
+    pd.testing.assert_frame_equal(fixture_audit_df, before)
+    assert list(df['Vendor']) == ['LAB VENDOR', 'LAB VENDOR', 'VENDOR', 'VENDOR']
+    assert list(df['Stock Number']) == ['12L', '7L', '2000AF', '110A']
+
+
+def test_classify_url_video(fixture_audit_df):
+    masks = data.classify_url_video(fixture_audit_df)
+    scalar_checks = {
+        "Valid V360": fixture_audit_df["Video URL from Vendor"].apply(data.check_url_field, args=(False,)),
+        "Blank/Invalid": fixture_audit_df["Video URL from Vendor"].apply(data.check_url_field, args=(True,)),
+        "Has Video": fixture_audit_df["Video Upload"].apply(data.check_video_field, args=(False,)),
+        "No Video": fixture_audit_df["Video Upload"].apply(data.check_video_field, args=(True,)),
+    }
+
+    assert list(masks.columns) == list(scalar_checks)
+    for col, expected in scalar_checks.items():
+        assert list(masks[col]) == list(expected.notna())
+
+
+def test_read_input_csv():
+    df = data.read_input_csv('tests/fixture.csv')
+
+    assert list(df.columns) == [
+        'Supplier', 'Video URL from Vendor', 'Video Upload', 'Cert of Origin', 'Stock #', 'CertNumber'
+    ]
+    assert df['Supplier'].dtype == 'category'
+    assert df['Stock #'].dtype == 'string'
+
+    audit_df = data.parse_vendor_audit(df, ['VENDOR'], '2024-08-12', 10)
+    assert list(audit_df['Stock Number']) == ['2000AF', '110A', '105A', '104A', '102A', '99A', '80A', '55C', '8F']
+    assert list(data.create_output_df(df, '2024-08-12')['Has Video']) == [1, 2, 9]
+
+
+def test_create_output_df(fixture_audit_df):
+    before = fixture_audit_df.copy()
+    df = data.create_output_df(fixture_audit_df, '2024-08-12')
+
+    pd.testing.assert_frame_equal(fixture_audit_df, before)
+    assert df.to_dict('records') == [
+        {'Vendor': 'BE Internal', 'Valid V360': 1, 'Blank/Invalid': 0, 'Has Video': 1, 'No Video': 0, 'Total Inv': 1,
+         'Type': 'Natural', 'Date': '2024-08-12', '% inv. w/ video': 1.0, '% Inv w/ URLs': 1.0},
+        {'Vendor': 'LAB VENDOR', 'Valid V360': 2, 'Blank/Invalid': 2, 'Has Video': 2, 'No Video': 2, 'Total Inv': 4,
+         'Type': 'Lab', 'Date': '2024-08-12', '% inv. w/ video': 0.5, '% Inv w/ URLs': 0.5},
+        {'Vendor': 'VENDOR', 'Valid V360': 6, 'Blank/Invalid': 5, 'Has Video': 9, 'No Video': 2, 'Total Inv': 10,
+         'Type': 'Natural', 'Date': '2024-08-12', '% inv. w/ video': 0.9, '% Inv w/ URLs': 0.6},
+    ]
+
+
+def test_split_unchanged(fixture_audit_df):
+    df = data.create_output_df(fixture_audit_df, '2024-08-12')
+    previous = {
+        'VENDOR': {'Prev Video': 9.0, 'Prev Total': 10.0, 'Prev Valid': 6.0, 'Prev Blank': 5.0, 'Prev Inven': 0.9},
+        'LAB VENDOR': {'Prev Video': 2, 'Prev Total': 4, 'Prev Valid': 1, 'Prev Blank': 3, 'Prev Inven': 0.5},
+    }
+    changed_df, unchanged = data.split_unchanged(df, previous)
+
+    assert unchanged == ['VENDOR']
+    assert list(changed_df['Vendor']) == ['BE Internal', 'LAB VENDOR']
+    assert list(data.add_comparison_columns(changed_df, previous).columns) == list(df.columns) + [
+        'Difference Since Last', 'Change in % inv. w/ video'
+    ]
+
+
+def test_stream_outputs(tmp_path):
+    lines = open('tests/fixture.csv').read().splitlines()
+    doubled = tmp_path / 'doubled.csv'
+    doubled.write_text('\n'.join(lines + lines[1:]) + '\n')  # every stock number twice, to check ties across chunks
+
+    for path in ['tests/fixture.csv', doubled]:
+        df = data.read_input_csv(path)
+        vendors = [i for i in df['Supplier'].dropna().unique() if i != 'BE Internal']
+        output_df, audit_df = data.stream_outputs(path, '2024-08-12', 3, chunksize=4)
+
+        pd.testing.assert_frame_equal(output_df, data.create_output_df(df, '2024-08-12'))
+        pd.testing.assert_frame_equal(audit_df, data.parse_vendor_audit(df, vendors, '2024-08-12', 3))
+    assert data.stream_outputs('tests/fixture.csv', '2024-08-12', chunksize=4)[1] is None
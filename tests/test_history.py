@@ -0,0 +1,31 @@
+from src import data, history
+
+
+def test_save_and_load_previous_values(fixture_audit_df):
+    df = data.create_output_df(fixture_audit_df, '2024-08-05')
+    history.save_run(df, '2024-08-05', 1, 5)
+    history.save_run(df.assign(**{'Has Video': 0}), '2024-08-12', 1, 6)
+
+    assert history.load_sheet_version(1) == 6
+    assert history.load_sheet_version(2) is None
+
+    cell_cols = {'Prev Video': 'Has Video', 'Prev Inven': '% inv. w/ video'}
+    previous = history.load_previous_values(1, '2024-08-12', cell_cols)
+    assert previous == {
+        row['Vendor']: {'Prev Video': row['Has Video'], 'Prev Inven': round(row['% inv. w/ video'], 4)}
+        for _, row in df.iterrows()
+    }
+    assert history.load_previous_values(1, '2024-08-19', cell_cols)['VENDOR']['Prev Video'] == 0
+    assert history.load_previous_values(1, '2024-08-05', cell_cols) == {}
+
+
+def test_runs_are_kept_per_sheet(fixture_audit_df):
+    df = data.create_output_df(fixture_audit_df, '2024-08-05')
+    cell_cols = {'Prev Video': 'Has Video'}
+    history.save_run(df, '2024-08-05', 1, 5)
+    history.save_run(df.assign(**{'Has Video': 0}), '2024-08-12', 2, 9)
+    history.save_run(df.assign(**{'Has Video': 0}), '2024-08-05', 2, 10)  # replaces sheet 2's run only
+
+    assert history.load_previous_values(1, '2024-08-19', cell_cols)['VENDOR']['Prev Video'] == 9
+    assert history.load_previous_values(2, '2024-08-19', cell_cols)['VENDOR']['Prev Video'] == 0
+
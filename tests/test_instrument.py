@@ -0,0 +1,65 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from src import instrument, ss
+from src.main import Main
+
+
+def test_run_summary(fixture_audit_df, fake_coverage_sheet, monkeypatch):
+    fake, _ = fake_coverage_sheet
+    fake.throttle_every = 5
+    monkeypatch.setenv(instrument.PROFILE_ENV, '1')
+    main = Main()
+    main.ss_client = fake.client()
+    ss.govern_client(main.ss_client, ss.RateGovernor())  # keep the 429 backoff out of the shared governor
+    main.input_df = fixture_audit_df
+    main.date = '2024-08-12'
+    main.coverages_sheet_name = 'Coverage'
+    main.run_coverages()
+
+    log_dir = Path(instrument.LOG_DIR)
+    [summary_file] = log_dir.glob('run_*_coverages.json')
+    summary = json.loads(summary_file.read_text())
+    assert [i['name'] for i in summary['stages']] == [
+        'Coverages: fetch sheet',
+        'Classify URLs and videos',
+        'Coverages: aggregate',
+        'Coverages: add new vendors',
+        'Coverages: upload',
+    ]
+    assert summary['requests'] == fake.request_count
+    assert summary['retries'] == fake.throttled_count == 1
+    assert summary['coverage_requests'] == 8
+    assert summary['stages'][1]['rows_per_sec'] > 0
+    assert list(log_dir.glob('profile_coverages_*.pstats'))
+    assert instrument.progress_text().startswith('finished')
+
+
+def test_stage_without_run():
+    with instrument.stage('no run') as stage:
+        pass
+    assert stage.duration is None
+    assert instrument.progress_text() == ''
+
+    with instrument.run('live'), instrument.stage('Step'):
+        assert instrument.progress_text().startswith('Step (0s), 0 requests')
+
+    with pytest.raises(ValueError), instrument.run('failing'):
+        raise ValueError('bad input')
+    [summary_file] = Path(instrument.LOG_DIR).glob('run_*_failing.json')
+    assert 'bad input' in json.loads(summary_file.read_text())['error']
+
+
+def test_nested_profiles(monkeypatch):
+    def pipeline(name):
+        with instrument.profile(name):
+            return sum(range(1000))
+
+    monkeypatch.setenv(instrument.PROFILE_ENV, '1')
+    with instrument.profile('both'), ThreadPoolExecutor(max_workers=2) as pool:
+        list(pool.map(pipeline, ['coverages', 'audits']))
+    [profile_file] = Path(instrument.LOG_DIR).glob('profile_*.pstats')
+    assert profile_file.name.startswith('profile_both_')
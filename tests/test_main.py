@@ -0,0 +1,136 @@
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src import data
+from src.main import Main
+
+
+def test_run_coverages_batched(fixture_audit_df, fake_coverage_sheet):
+    fake, sheet_id = fake_coverage_sheet
+    main = Main()
+    main.ss_client = fake.client()
+    main.input_df = fixture_audit_df
+    main.date = '2024-08-12'
+    main.coverages_sheet_name = 'Coverage'
+    main.run_coverages()
+
+    rows = fake.sheet_values(sheet_id)
+    assert [row.get('Vendor') for row in rows if '_parent' not in row] == ['VENDOR', 'BE Internal', 'LAB VENDOR']
+    newest = [row for row in rows if row.get('_parent') == 'VENDOR'][0]
+    assert newest['Date'] == '2024-08-12'
+    assert newest['Difference Since Last'] == 2
+    assert newest['Change in % inv. w/ video'] == 0.2
+
+    # list, sheet details, one page of parents, first children, one request for the new parents, one per vendor
+    assert main.coverage_requests == fake.request_count == 8
+
+
+def test_run_coverages_cpu_pool(fixture_audit_df, fake_coverage_sheet):
+    fake, sheet_id = fake_coverage_sheet
+    main = Main()
+    main.ss_client = fake.client()
+    main.input_df = fixture_audit_df
+    main.date = '2024-08-12'
+    main.coverages_sheet_name = 'Coverage'
+    with ProcessPoolExecutor(1) as main.cpu_pool:
+        main.run_coverages()
+
+    newest = [row for row in fake.sheet_values(sheet_id) if row.get('_parent') == 'VENDOR'][0]
+    assert newest['Difference Since Last'] == 2
+    assert main.coverage_df['Has Video'].tolist() == [1, 2, 9]  # state set by the run is kept on main
+
+
+def test_iterate_and_load_rows_errors_per_vendor(fixture_audit_df, fake_coverage_sheet):
+    fake, sheet_id = fake_coverage_sheet
+    main = Main()
+    main.ss_client = fake.client()
+    main.coverages_sheet_name = 'Coverage'
+    main.get_coverages_ss()
+    main.coverage_df = data.create_output_df(fixture_audit_df, '2024-08-12')
+    main.load_new_vendors()
+    main.ssheet_cov.parent_rows['LAB VENDOR'] = 1  # no such row
+
+    with pytest.raises(RuntimeError, match='1 of 3 vendors: LAB VENDOR'):
+        main.iterate_and_load_rows()
+
+    assert list(main.upload_errors) == ['LAB VENDOR']
+    uploaded = [row['_parent'] for row in fake.sheet_values(sheet_id) if row.get('Date') == '2024-08-12']
+    assert sorted(uploaded) == ['BE Internal', 'VENDOR']
+
+
+def test_run_both_reports_each_pipeline(fixture_audit_df, fake_coverage_sheet):
+    fake, sheet_id = fake_coverage_sheet
+    main = Main()
+    main.ss_client = fake.client()
+    main.input_df = fixture_audit_df
+    main.date = '2024-08-12'
+    main.coverages_sheet_name = 'Coverage'
+    main.audit_sheet_name = 'Missing Audit'
+    main.audit_num = 2
+    main.selected_vendors = {'VENDOR': True}
+
+    with pytest.raises(RuntimeError, match='Audits failed'):
+        main.run_both()
+
+    assert list(main.pipeline_errors) == ['Audits']
+    assert [row['Date'] for row in fake.sheet_values(sheet_id) if row.get('_parent') == 'VENDOR'][0] == '2024-08-12'
+
+
+def test_main_import_is_light():
+    """diamonds imports src.main before the UI starts, so it must not pull in the heavy modules."""
+    code = "import sys, src.main; print(sorted({'pandas', 'smartsheet', 'validators', 'tabulate'} & set(sys.modules)))"
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert out.strip() == '[]'
+
+
+def test_run_both_leaves_input_df_unchanged(fake_coverage_sheet):
+    fake, _ = fake_coverage_sheet
+    audit_id = fake.add_sheet('Audit', ['Vendor', 'Video Link', 'Stock Number', 'Cert Number', 'Date'])
+
+    main = Main()
+    main.ss_client = fake.client()
+    main.input_df = data.read_input_csv(Path(__file__).parent / 'fixture.csv')
+    before = main.input_df.copy()
+    main.date = '2024-08-12'
+    main.coverages_sheet_name = 'Coverage'
+    main.audit_sheet_name = 'Audit'
+    main.audit_num = 2
+    main.selected_vendors = {'VENDOR': True}
+    main.run_both()
+
+    pd.testing.assert_frame_equal(main.input_df, before)
+    assert [row['Stock Number'] for row in fake.sheet_values(audit_id)] == ['2000AF', '110A']
+    assert main.peak_memory_mb > 0
+
+
+def test_run_coverages_uses_history(fixture_audit_df, fake_coverage_sheet):
+    fake, sheet_id = fake_coverage_sheet
+    main = Main()
+    main.ss_client = fake.client()
+    main.input_df = fixture_audit_df
+    main.coverages_sheet_name = 'Coverage'
+    main.date = '2024-08-12'
+    main.run_coverages()
+
+    main.date = '2024-08-19'
+    main.input_df = fixture_audit_df.assign(**{'Video Upload': 'Y'})
+    fake.request_count = 0
+    main.run_coverages()
+
+    # sheet details, one page of parents, one per vendor. Previous values come from the history store
+    assert fake.request_count == 5
+    newest = [row for row in fake.sheet_values(sheet_id) if row.get('_parent') == 'VENDOR'][0]
+    assert newest['Date'] == '2024-08-19'
+    assert newest['Difference Since Last'] == newest['Has Video'] - 9
+
+    fake.seed_rows(sheet_id, [{'Vendor': 'EDITED'}])
+    fake.sheets[sheet_id]['version'] += 1  # changed by someone else, so the sheet is read again
+    main.date = '2024-08-26'
+    fake.request_count = 0
+    main.run_coverages()
+    assert fake.request_count == 6
@@ -0,0 +1,160 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+import requests
+import smartsheet
+
+from src import ss
+
+
+def test_chunk_rows():
+    rows = [{"cells": [{"columnId": 1, "value": "x" * i}]} for i in range(10)]
+
+    by_size = list(ss.chunk_rows(rows, max_rows=4, max_bytes=150))
+    assert [len(chunk) for chunk, _ in by_size] == [3, 3, 3, 1]
+    assert all(size <= 150 for _, size in by_size)
+    assert [row for chunk, _ in by_size for row in chunk] == rows
+
+    by_count = list(ss.chunk_rows(rows, max_rows=4, max_bytes=10_000))
+    assert [len(chunk) for chunk, _ in by_count] == [4, 4, 2]
+
+
+def test_get_sheet_id_cache(fake_coverage_sheet):
+    fake, sheet_id = fake_coverage_sheet
+    client = fake.client()
+
+    ss.SSheet(client=client).get_sheet('coverage')
+    assert fake.request_count == 2  # list, sheet
+
+    ss.SSheet(client=client).get_sheet('Coverage')
+    assert fake.request_count == 3  # cached id: sheet
+
+    fake.sheets[sheet_id]['name'] = 'Old Coverage'
+    new_id = fake.add_sheet('Coverage', ['Vendor'])
+    ssheet = ss.SSheet(client=client)
+    ssheet.get_sheet('Coverage')
+    assert ssheet.sheet.id == new_id
+    assert fake.request_count == 6  # stale sheet, list, sheet
+
+
+def test_get_parent_history(fake_coverage_sheet):
+    fake, sheet_id = fake_coverage_sheet
+    [parent_id] = fake.seed_rows(sheet_id, [{'Vendor': 'NEW VENDOR'}])
+    fake.seed_rows(sheet_id, [{'Vendor': 'NEW VENDOR', 'Has Video': 1, '% inv. w/ video': 0.1}], parent_id=parent_id)
+    fake.seed_rows(sheet_id, [{'Vendor': 'EMPTY VENDOR'}])
+    cell_cols = {'Prev Video': 'Has Video', 'Prev Inven': '% inv. w/ video'}
+
+    full = ss.SSheet(client=fake.client())
+    full.get_sheet(sheet_id)
+    full.get_parents_and_first_child_data(cell_cols)
+
+    paged = ss.SSheet(client=fake.client())
+    paged.get_parent_history(sheet_id, cell_cols, page_size=2)
+
+    assert paged.parent_rows == full.parent_rows
+    assert paged.previous_values == full.previous_values == {
+        'VENDOR': {'Prev Video': 7, 'Prev Inven': 0.7},
+        'NEW VENDOR': {'Prev Video': 1, 'Prev Inven': 0.1},
+    }
+
+
+def test_sheet_index(fake_coverage_sheet):
+    fake, sheet_id = fake_coverage_sheet
+    ssheet = ss.SSheet(client=fake.client())
+    ssheet.get_sheet(sheet_id)
+    parent_id, *child_ids = ssheet.index.row_ids
+
+    assert ssheet.index.children == {parent_id: child_ids}
+    assert ssheet.index.value(child_ids[1], ssheet.cols_dict['Date']) == '2024-07-29'
+    assert ssheet.get_col_values_by_col_name('Has Video') == [None, 7, 5]
+
+
+def test_rate_governor_retries_429(fake_coverage_sheet):
+    fake, sheet_id = fake_coverage_sheet
+    fake.throttle_every = 2
+    client = fake.client()
+    governor = ss.RateGovernor(max_per_min=300)
+    ss.govern_client(client, governor)
+
+    ssheet = ss.SSheet(client=client)
+    ssheet.get_sheet(sheet_id)
+    ssheet.add_parent_rows('Vendor', ['NEW VENDOR'])
+
+    assert fake.throttled_count == 1
+    assert governor.throttled_count == 1
+    assert governor.rate == 151  # halved, then one success
+    assert 'NEW VENDOR' in [row.get('Vendor') for row in fake.sheet_values(sheet_id)]
+
+
+def test_client_pool():
+    client = ss.get_client('test-key', max_connections=2)
+    assert ss.SSheet('test-key').ss_client is client
+    assert ss.get_client('other-key') is not client
+    assert client._session.get_adapter('https://api.smartsheet.com').adapter._pool_maxsize == 2
+
+    ss.close_clients()
+    assert ss.get_client('test-key') is not client
+    ss.close_clients()
+
+
+def test_row_payloads(fake_coverage_sheet):
+    fake, sheet_id = fake_coverage_sheet
+    ssheet = ss.SSheet(client=fake.client())
+    ssheet.get_sheet(sheet_id)
+    df = pd.DataFrame({'Vendor': ['A', None], 'Has Video': [3, 4]})
+
+    rows = list(ssheet.row_payloads(df, toBottom=True))
+    cols = ssheet.cols_dict
+    assert rows[0] == {
+        'toBottom': True,
+        'cells': [
+            {'columnId': cols['Vendor'], 'value': 'A', **ssheet.base_row_vals},
+            {'columnId': cols['Has Video'], 'value': 3, **ssheet.base_row_vals},
+        ],
+    }
+    assert type(rows[0]['cells'][1]['value']) is int
+    assert [i['columnId'] for i in rows[1]['cells']] == [cols['Has Video']]
+
+    ssheet.upload_dataframe(df)
+    assert fake.sheet_values(sheet_id)[-2:] == [{'Vendor': 'A', 'Has Video': 3}, {'Has Video': 4}]
+
+
+def test_upload_fails_fast_on_permanent_errors(fake_coverage_sheet):
+    fake, sheet_id = fake_coverage_sheet
+    ssheet = ss.SSheet(client=fake.client())
+    ssheet.get_sheet(sheet_id)
+    results = []
+
+    with pytest.raises(RuntimeError):
+        ssheet.upload_rows([{'toBottom': True, 'cells': [{'columnId': 1, 'value': 'x'}]}], progress=results.append)
+    assert results[0].attempts == 1
+    assert '1036' in str(results[0].error)  # unknown column
+
+
+def test_is_transient():
+    def wrapped(cause: Exception) -> Exception:
+        try:
+            raise smartsheet.exceptions.UnexpectedRequestError(None, None) from cause
+        except smartsheet.exceptions.UnexpectedRequestError as err:
+            return err
+
+    assert ss.is_transient(wrapped(requests.exceptions.ConnectionError()))
+    assert ss.is_transient(wrapped(requests.exceptions.ConnectTimeout()))
+    assert not ss.is_transient(wrapped(requests.exceptions.ReadTimeout()))  # the rows may have been added
+    assert not ss.is_transient(ValueError())
+
+
+def test_fake_rejects_overlapping_writes(fake_coverage_sheet):
+    fake, sheet_id = fake_coverage_sheet
+    fake.latency = 0.2
+    ssheets = [ss.SSheet(client=fake.client(max_retry_time=0)) for _ in range(2)]
+    for ssheet in ssheets:
+        ssheet.get_sheet(sheet_id)
+
+    with ThreadPoolExecutor(2) as pool:
+        futures = [pool.submit(i.add_parent_rows, 'Vendor', [f'VENDOR {n}']) for n, i in enumerate(ssheets)]
+        errors = [i.exception() for i in futures]
+
+    assert fake.conflict_count == 1
+    assert sum(i is not None for i in errors) == 1  # SDK 3 raises AttributeError for 4004, SDK 4 a retry error
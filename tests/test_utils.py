@@ -0,0 +1,28 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from src import utils
+
+
+def test_save_df_output_rotates(monkeypatch):
+    monkeypatch.setattr(utils, 'OUTPUT_KEEP', 2)
+    df = pd.DataFrame({'Vendor': ['VENDOR', 'LAB VENDOR'], 'Stock Number': ['110A', '12L']})
+
+    paths = []
+    for i, date in enumerate(['2024-08-05', '2024-08-12', '2024-08-19']):
+        paths.append(utils.save_df_output(df, date).result())
+        os.utime(paths[-1], (i, i))  # distinct mtimes, oldest first
+
+    assert sorted(os.listdir(utils.OUTPUT_DIR)) == sorted(Path(i).name for i in paths[1:])
+    pd.testing.assert_frame_equal(pd.read_csv(paths[-1]), df)
+    assert 'DATE: 2024-08-19' in (Path(utils.OUTPUT_DIR).parent / 'df_output.txt').read_text()
+
+
+def test_save_sheet_id_concurrently():
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(utils.save_sheet_id, [f'Sheet {i}' for i in range(40)], range(40)))
+
+    assert [utils.load_sheet_id(f'sheet {i}') for i in range(40)] == list(range(40))